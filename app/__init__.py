@@ -1,12 +1,15 @@
-from flask import Flask, render_template
+import posixpath
+from flask import Flask, render_template, request, abort
 from flask_sqlalchemy import SQLAlchemy  # 导入SQLAlchemy
 from flask_login import LoginManager
 from flask_migrate import Migrate
 from config import config
 from flask_wtf.csrf import CSRFProtect  # 顶部新增
+from werkzeug.middleware.proxy_fix import ProxyFix
+from app.utils.db_routing import RoutingSession
 csrf = CSRFProtect()                   # 创建扩展实例
 # 1. 先初始化数据库对象（关键：必须在导入路由前完成）
-db = SQLAlchemy()  # 创建db对象，供其他模块导入
+db = SQLAlchemy(session_options={'class_': RoutingSession})  # 创建db对象，供其他模块导入（会话支持读写分离）
 login_manager = LoginManager()
 login_manager.login_view = 'auth.login'  # 已存在
 login_manager.login_message = '请先登录'  # 已存在
@@ -14,15 +17,22 @@ login_manager.login_message_category = 'info'  # 已存在
 
 @login_manager.user_loader
 def load_user(user_id):
-    """根据用户ID加载用户（Flask-Login 必需）"""
-    from app.models import User  # 导入User模型
-    return User.query.get(int(user_id))  # 通过ID查询用户
+    """根据用户ID加载用户（Flask-Login 必需），命中缓存时不查数据库"""
+    from app.utils.user_cache import load_principal
+    return load_principal(user_id)
 
 migrate = Migrate()
 def create_app(config_name='default'):
     app = Flask(__name__, instance_relative_config=True)
     app.config.from_object(config[config_name])
-    # 2. 初始化扩展（将db绑定到app）
+    app.config['CONFIG_NAME'] = config_name  # 后台进程池按同一配置重建应用
+    # 反向代理之后按 X-Forwarded-For 还原客户端地址（登录限流按 IP 统计）
+    if app.config.get('PROXY_FIX_X_FOR') or app.config.get('PROXY_FIX_X_PROTO'):
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config.get('PROXY_FIX_X_FOR', 0),
+                                x_proto=app.config.get('PROXY_FIX_X_PROTO', 0))
+    # 2. 初始化扩展（将db绑定到app；连接池参数先按配置补全）
+    from app.utils.db_pool import configure_engine_options
+    configure_engine_options(app)
     db.init_app(app)  # 这里才将db与app关联，不影响之前的导入
     login_manager.init_app(app)
     migrate.init_app(app, db)
@@ -37,6 +47,33 @@ def create_app(config_name='default'):
     app.register_blueprint(auth_bp, url_prefix='/auth')
     app.register_blueprint(projects_bp, url_prefix='/projects')
     app.register_blueprint(admin_bp, url_prefix='/admin')
+    # 5. 汇总表/项目版本/步骤计数器/全文检索/输入联想/用户缓存/读写分离维护事件与命令行命令
+    from app.utils.rollup import register_rollup_events
+    from app.utils.conditional import register_touch_events
+    from app.utils.step_counters import register_step_counter_events
+    from app.utils.search import register_search_events
+    from app.utils.typeahead import register_typeahead_events
+    from app.utils.user_cache import register_user_cache_events
+    from app.utils.db_routing import register_routing_events
+    from app.commands import register_commands
+    register_rollup_events()
+    register_touch_events()
+    register_step_counter_events()
+    register_search_events()
+    register_typeahead_events()
+    register_user_cache_events()
+    register_routing_events()
+    register_commands(app)
+    # 旧版上传目录不再经 static 直接访问，统一走 projects.download_file 的登录检查
+    # 按规范化后的文件名判断（/static/./uploads/、/static/x/../uploads/ 都指向同一目录）
+    @app.before_request
+    def block_static_uploads():
+        if request.endpoint != 'static':
+            return
+        filename = posixpath.normpath((request.view_args or {}).get('filename', '').replace('\\', '/'))
+        filename = filename.lstrip('/').lower()
+        if filename == 'uploads' or filename.startswith('uploads/'):
+            abort(404)
     # 错误处理
     @app.errorhandler(404)
     def page_not_found(e):
@@ -45,7 +82,7 @@ def create_app(config_name='default'):
     def internal_server_error(e):
         return render_template('errors/500.html'), 500
     return app
-# 5. 确保db对象可被外部导入（重要）
+# 6. 确保db对象可被外部导入（重要）
 __all__ = ['db', 'create_app']
 
 
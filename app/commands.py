@@ -0,0 +1,74 @@
+"""flask 命令行维护命令"""
+import click
+
+
+def register_commands(app):
+    """注册 flask CLI 命令"""
+
+    @app.cli.command('rebuild-stats')
+    def rebuild_stats():
+        """全量重建仪表盘汇总表 project_stats"""
+        from app.utils.rollup import rebuild_project_stats
+        count = rebuild_project_stats()
+        click.echo(f'汇总表已重建，共 {count} 行')
+
+    @app.cli.command('repair-step-counters')
+    def repair_step_counters():
+        """按 project_steps 实际数据修复项目上的步骤计数器"""
+        from app.utils.step_counters import repair_step_counters as repair
+        fixed = repair()
+        click.echo(f'步骤计数器已校正，修复 {fixed} 个项目')
+
+    @app.cli.command('rebuild-search-index')
+    def rebuild_search_index():
+        """重建全文检索表（仅 SQLite；MySQL 的 FULLTEXT 索引自动维护）"""
+        from app.utils.search import rebuild_search_index as rebuild
+        count = rebuild()
+        click.echo(f'检索表已重建，共 {count} 个项目')
+
+    @app.cli.command('fail-stale-imports')
+    def fail_stale_imports():
+        """把超过 IMPORT_JOB_TIMEOUT 未结束的导入任务标记为失败（释放并发名额）"""
+        from app.utils.import_jobs import fail_stale_jobs
+        count = fail_stale_jobs()
+        click.echo(f'已标记 {count} 个遗留导入任务为失败')
+
+    @app.cli.command('migrate-file-storage')
+    @click.option('--batch-size', default=100, show_default=True, help='每批处理的文件记录数')
+    def migrate_file_storage(batch_size):
+        """把旧版按项目目录保存的上传文件迁入按 SHA-256 去重的内容存储"""
+        from app.utils.file_storage import migrate_legacy_files
+        migrated, missing = migrate_legacy_files(batch_size)
+        click.echo(f'已迁移 {migrated} 个文件，磁盘上缺失 {missing} 个')
+
+    @app.cli.command('expire-uploads')
+    def expire_uploads():
+        """清理超过 UPLOAD_SESSION_TTL 未完成的分块上传会话及临时文件"""
+        from app.utils.chunked_upload import expire_upload_sessions
+        total = 0
+        while True:
+            count = expire_upload_sessions()
+            total += count
+            if not count:
+                break
+        click.echo(f'已清理 {total} 个过期上传')
+
+    @app.cli.command('gc-files')
+    def gc_files():
+        """执行磁盘文件删除队列（重试后台任务失败的条目）"""
+        from app.utils.file_gc import process_file_deletions
+        removed, failed = process_file_deletions()
+        click.echo(f'已删除 {removed} 个文件，失败 {failed} 个')
+
+    @app.cli.command('sweep-files')
+    @click.option('--fix', is_flag=True, help='孤儿文件加入删除队列并校正引用计数（默认只报告）')
+    @click.option('--batch-size', default=1000, show_default=True, help='每批检查的文件 / 记录数')
+    def sweep_files(fix, batch_size):
+        """对账上传目录与 project_files / file_blobs，报告或清理两个方向的孤儿"""
+        from app.utils.file_gc import sweep_files as sweep, process_file_deletions
+        report = sweep(fix=fix, batch_size=batch_size)
+        for line in report.lines():
+            click.echo(line)
+        if fix:
+            removed, failed = process_file_deletions()
+            click.echo(f'已删除 {removed} 个文件，失败 {failed} 个')
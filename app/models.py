@@ -1,7 +1,8 @@
-from datetime import datetime, timedelta
+import json
+from datetime import date, datetime, timedelta
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import check_password_hash
 from app import db
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
@@ -14,11 +15,9 @@ class User(UserMixin, db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(
-            password,
-            method='pbkdf2:sha256:100000',
-            salt_length=16
-        )
+        # 哈希方法（成本）由 PASSWORD_HASH_METHOD 配置，旧哈希在登录成功时自动升级
+        from app.utils.passwords import make_password_hash
+        self.password_hash = make_password_hash(password)
     
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
@@ -39,13 +38,21 @@ class DynamicColumn(db.Model):
         return f'<DynamicColumn {self.name}>'
 class Project(db.Model):
     __tablename__ = 'projects'
+    __table_args__ = (
+        db.Index('ix_projects_created_at_id', 'created_at', 'id'),  # 列表游标分页
+        db.Index('ix_projects_progress_created_at', 'contract_progress', 'created_at', 'id'),  # 按进度筛选 + 分页
+        db.Index('ix_projects_steps_percent', 'steps_percent', 'created_at', 'id'),  # 按步骤完成度排序 + 分页
+        # 全文检索（仅 MySQL；SQLite 使用 FTS5 表 project_search，见 app/utils/search.py）
+        db.Index('ft_projects_search', 'contract_name', 'contract_number', 'party_a', 'party_b', 'party_c',
+                 mysql_prefix='FULLTEXT', mysql_with_parser='ngram').ddl_if(dialect='mysql'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     contract_name = db.Column(db.String(200), nullable=False)
-    sign_date = db.Column(db.Date, nullable=False)
+    sign_date = db.Column(db.Date, nullable=False, index=True)
     contract_number = db.Column(db.String(50), unique=True, nullable=False, index=True)
-    contract_progress = db.Column(db.String(50), default='未开始', index=True)
-    party_a = db.Column(db.String(100), nullable=False)
+    contract_progress = db.Column(db.String(50), default='未开始')
+    party_a = db.Column(db.String(100), nullable=False, index=True)
     party_b = db.Column(db.String(100), nullable=False)
     party_c = db.Column(db.String(100))
     project_amount = db.Column(db.Float, default=0.0)
@@ -53,12 +60,16 @@ class Project(db.Model):
     payment_status = db.Column(db.String(50), default='未收款')
     supply_status = db.Column(db.String(50), default='未供货')
     acceptance_status = db.Column(db.String(50), default='未验收')
-    maintenance_time = db.Column(db.Date)
+    maintenance_time = db.Column(db.Date, index=True)
     business_person = db.Column(db.String(100), index=True)
     project_manager = db.Column(db.String(100), index=True)
+    # 步骤计数器（由 ProjectStep 变更事件维护，flask repair-step-counters 可修复）
+    steps_total = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    steps_completed = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    steps_percent = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     # 关系定义（修复点1：使用 back_populates 替代 backref）
     creator = db.relationship('User', backref='projects')
@@ -68,8 +79,29 @@ class Project(db.Model):
     
     def __repr__(self):
         return f'<Project {self.contract_name}>'
+class ProjectStat(db.Model):
+    """仪表盘汇总表：按 (年, 月, 合同进度, 收款情况) 预聚合的项目数和金额"""
+    __tablename__ = 'project_stats'
+    __table_args__ = (
+        db.UniqueConstraint('year', 'month', 'contract_progress', 'payment_status', name='uq_project_stats_key'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    year = db.Column(db.Integer, nullable=False)
+    month = db.Column(db.Integer, nullable=False)
+    contract_progress = db.Column(db.String(50))
+    payment_status = db.Column(db.String(50))
+    project_count = db.Column(db.Integer, nullable=False, default=0)
+    total_amount = db.Column(db.Float, nullable=False, default=0.0)
+
+    def __repr__(self):
+        return f'<ProjectStat {self.year}-{self.month} {self.contract_progress} {self.payment_status}>'
 class ProjectNote(db.Model):
     __tablename__ = 'project_notes'
+    __table_args__ = (
+        db.Index('ft_project_notes_content', 'content',
+                 mysql_prefix='FULLTEXT', mysql_with_parser='ngram').ddl_if(dialect='mysql'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     # 修复点2：删除重复的 content 字段（只保留一个）
@@ -84,6 +116,17 @@ class ProjectNote(db.Model):
     
     def __repr__(self):
         return f'<ProjectNote {self.id}>'
+class FileBlob(db.Model):
+    """上传文件的内容，按 SHA-256 只存一份；ref_count 为引用它的 ProjectFile 数"""
+    __tablename__ = 'file_blobs'
+
+    sha256 = db.Column(db.String(64), primary_key=True)
+    size = db.Column(db.BigInteger, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<FileBlob {self.sha256}>'
 class ProjectFile(db.Model):
     __tablename__ = 'project_files'
     
@@ -93,6 +136,8 @@ class ProjectFile(db.Model):
     original_filename = db.Column(db.String(255), nullable=False)
     file_type = db.Column(db.String(50), nullable=False)
     file_path = db.Column(db.String(500), nullable=False)
+    sha256 = db.Column(db.String(64), db.ForeignKey('file_blobs.sha256'), index=True)  # 内容存储的键，旧文件为空
+    file_size = db.Column(db.BigInteger)
     uploaded_by = db.Column(db.Integer, db.ForeignKey('users.id'))
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
     
@@ -100,8 +145,55 @@ class ProjectFile(db.Model):
     
     def __repr__(self):
         return f'<ProjectFile {self.filename}>'
+class FileDeletion(db.Model):
+    """待删除的磁盘文件，与删除记录的操作同事务写入，由后台任务 / flask gc-files 执行"""
+    __tablename__ = 'file_deletions'
+
+    id = db.Column(db.Integer, primary_key=True)
+    path = db.Column(db.String(500), nullable=False)
+    sha256 = db.Column(db.String(64))  # 内容文件：执行时记录已被重新创建则跳过
+    attempts = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    last_error = db.Column(db.String(500))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<FileDeletion {self.path}>'
+class UploadSession(db.Model):
+    """分块上传会话：init 创建，按偏移量追加分块，complete 后转为 ProjectFile"""
+    __tablename__ = 'upload_sessions'
+
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False)
+    original_filename = db.Column(db.String(255), nullable=False)
+    file_type = db.Column(db.String(50), nullable=False)
+    total_size = db.Column(db.BigInteger, nullable=False)
+    received_size = db.Column(db.BigInteger, nullable=False, default=0, server_default='0')
+    sha256 = db.Column(db.String(64))  # 客户端声明的校验值（可选）
+    temp_path = db.Column(db.String(500), nullable=False)
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)  # 最后一次收到分块，过期清理依据
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'filename': self.original_filename,
+            'size': self.total_size,
+            'offset': self.received_size,
+        }
+
+    def __repr__(self):
+        return f'<UploadSession {self.id}>'
 class ProjectDynamicValue(db.Model):
     __tablename__ = 'project_dynamic_values'
+    __table_args__ = (
+        db.UniqueConstraint('project_id', 'column_id', name='uq_project_dynamic_values_project_column'),
+        # 按动态列筛选 / 排序：(列, 值, 项目) 覆盖索引
+        db.Index('ix_project_dynamic_values_string', 'column_id', 'value_string', 'project_id'),
+        db.Index('ix_project_dynamic_values_integer', 'column_id', 'value_integer', 'project_id'),
+        db.Index('ix_project_dynamic_values_date', 'column_id', 'value_date', 'project_id'),
+        db.Index('ix_project_dynamic_values_boolean', 'column_id', 'value_boolean', 'project_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False)
@@ -115,26 +207,33 @@ class ProjectDynamicValue(db.Model):
     
     column = db.relationship('DynamicColumn')
     
+    @property
+    def data_type(self):
+        # 优先从进程内列注册表取类型，避免每个值都懒加载一次 DynamicColumn
+        from app.utils.dynamic_columns import get_column
+        info = get_column(self.column_id)
+        return info.data_type if info is not None else self.column.data_type
+    
     @property
     def value(self):
-        if self.column.data_type == 'string':
+        if self.data_type == 'string':
             return self.value_string
-        elif self.column.data_type == 'integer':
+        elif self.data_type == 'integer':
             return self.value_integer
-        elif self.column.data_type == 'date':
+        elif self.data_type == 'date':
             return self.value_date
-        elif self.column.data_type == 'boolean':
+        elif self.data_type == 'boolean':
             return self.value_boolean
         return None
     @value.setter
     def value(self, val):
-        if self.column.data_type == 'string':
+        if self.data_type == 'string':
             self.value_string = str(val) if val is not None else None
-        elif self.column.data_type == 'integer':
+        elif self.data_type == 'integer':
             self.value_integer = int(val) if val is not None else None
-        elif self.column.data_type == 'date':
-            self.value_date = val if isinstance(val, datetime.date) else None
-        elif self.column.data_type == 'boolean':
+        elif self.data_type == 'date':
+            self.value_date = val if isinstance(val, date) else None
+        elif self.data_type == 'boolean':
             self.value_boolean = bool(val) if val is not None else None
     
     def __repr__(self):
@@ -153,11 +252,82 @@ class ProjectStep(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # 关系
-    project = db.relationship('Project', backref=db.backref('steps', lazy=True, order_by='ProjectStep.order'))
+    project = db.relationship('Project', backref=db.backref('steps', lazy=True, order_by='[ProjectStep.order, ProjectStep.id]',
+                                                           cascade='all, delete-orphan'))
 def complete(self):
     self.is_completed = True
     self.completed_at = datetime.utcnow()
 
 def uncomplete(self):
     self.is_completed = False
-    self.completed_at = None
\ No newline at end of file
+    self.completed_at = None
+
+class StepTemplate(db.Model):
+    """项目步骤模板：创建 / 导入项目时按模板批量生成步骤"""
+    __tablename__ = 'step_templates'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)
+    steps = db.Column(db.Text, nullable=False, default='[]')  # JSON：[{"title": ..., "is_completed": ...}]
+    is_default = db.Column(db.Boolean, default=False)
+    is_active = db.Column(db.Boolean, default=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @property
+    def step_list(self):
+        return json.loads(self.steps) if self.steps else []
+
+    @step_list.setter
+    def step_list(self, items):
+        self.steps = json.dumps(items, ensure_ascii=False)
+
+    def __repr__(self):
+        return f'<StepTemplate {self.name}>'
+
+class ImportJob(db.Model):
+    """Excel 后台导入任务"""
+    __tablename__ = 'import_jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    filename = db.Column(db.String(255), nullable=False)  # 原始文件名
+    file_path = db.Column(db.String(500), nullable=False)  # 暂存的工作簿路径
+    status = db.Column(db.String(20), default='pending', index=True)  # pending/running/finished/failed
+    total_rows = db.Column(db.Integer, default=0)
+    processed_rows = db.Column(db.Integer, default=0)
+    success_count = db.Column(db.Integer, default=0)
+    error_count = db.Column(db.Integer, default=0)
+    errors = db.Column(db.Text)  # JSON 数组，「第N行: ...」
+    message = db.Column(db.String(500))  # 整体失败原因
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    creator = db.relationship('User')
+
+    @property
+    def error_list(self):
+        return json.loads(self.errors) if self.errors else []
+
+    @property
+    def is_done(self):
+        return self.status in ('finished', 'failed')
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'filename': self.filename,
+            'status': self.status,
+            'total_rows': self.total_rows,
+            'processed_rows': self.processed_rows,
+            'success_count': self.success_count,
+            'error_count': self.error_count,
+            'errors': self.error_list,
+            'message': self.message,
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S') if self.created_at else None,
+            'finished_at': self.finished_at.strftime('%Y-%m-%d %H:%M:%S') if self.finished_at else None,
+        }
+
+    def __repr__(self):
+        return f'<ImportJob {self.id} {self.status}>'
@@ -1,9 +1,13 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user  # ✅ 导入 current_user
-from sqlalchemy import func  # ✅ 导入 func
 from app import db
-from app.models import User, DynamicColumn, Project  # ✅ 导入 Project（dashboard用）
+from app.models import User, DynamicColumn, ProjectDynamicValue, Project, StepTemplate  # ✅ 导入 Project（dashboard用）
 from app.utils.decorators import admin_required
+from app.utils.db_routing import read_replica
+from app.utils.db_pool import pool_stats
+from app.utils.rollup import stats_totals
+from app.utils.dynamic_columns import invalidate_columns
+from app.utils.step_templates import parse_steps_text, steps_to_text
 admin_bp = Blueprint('admin', __name__)
 # ---------------------- 动态列管理 ----------------------
 @admin_bp.route('/columns', methods=['GET', 'POST'])  # ✅ 支持 GET/POST
@@ -32,6 +36,7 @@ def add_column():
     new_column = DynamicColumn(name=name, data_type=data_type, is_active=True)
     db.session.add(new_column)
     db.session.commit()
+    invalidate_columns()
     flash('动态列添加成功', 'success')
     return redirect(url_for('admin.columns'))
 @admin_bp.route('/columns/edit/<int:column_id>', methods=['GET', 'POST'])  # ✅ 参数名 column_id
@@ -51,6 +56,7 @@ def edit_column(column_id):
             return redirect(url_for('admin.edit_column', column_id=column_id))
         
         db.session.commit()
+        invalidate_columns()
         flash('列更新成功！', 'success')
         return redirect(url_for('admin.columns'))
     
@@ -63,21 +69,92 @@ def toggle_column(column_id):
     column = DynamicColumn.query.get_or_404(column_id)
     column.is_active = not column.is_active
     db.session.commit()
+    invalidate_columns()
     status = '激活' if column.is_active else '停用'
     flash(f'列已{status}', 'success')
     return redirect(url_for('admin.columns'))
 
-@login_required
-@admin_required    
 # 列删除 —— 函数名、路径、endpoint 全部唯一
 @admin_bp.route('/columns/delete/<int:column_id>', methods=['POST'])
+@login_required
+@admin_required
 def delete_column_item(column_id):
-    """删除动态列"""
+    """删除动态列（连同该列的全部值）"""
     column = DynamicColumn.query.get_or_404(column_id)
+    ProjectDynamicValue.query.filter_by(column_id=column_id).delete(synchronize_session=False)
     db.session.delete(column)
     db.session.commit()
+    invalidate_columns()
     flash('列已删除', 'success')
     return redirect(url_for('admin.columns'))
+# ---------------------- 步骤模板管理 ----------------------
+@admin_bp.route('/step_templates')
+@login_required
+@admin_required
+def step_templates():
+    """步骤模板列表页"""
+    templates = StepTemplate.query.order_by(StepTemplate.is_default.desc(), StepTemplate.name).all()
+    return render_template('admin/step_templates.html', title='步骤模板', templates=templates,
+                           steps_to_text=steps_to_text)
+def _save_step_template(template):
+    """从表单读取模板字段，校验失败返回错误信息"""
+    name = request.form.get('name', '').strip()
+    items = parse_steps_text(request.form.get('steps'))
+    if not name:
+        return '模板名称不能为空'
+    if not items:
+        return '模板至少需要一个步骤'
+    duplicate = StepTemplate.query.filter(StepTemplate.name == name, StepTemplate.id != template.id).first()
+    if duplicate:
+        return f'模板名称 "{name}" 已存在'
+    template.name = name
+    template.step_list = items
+    template.is_active = 'is_active' in request.form
+    if 'is_default' in request.form:
+        # 默认模板只能有一个
+        StepTemplate.query.filter(StepTemplate.id != template.id).update({'is_default': False})
+        template.is_default = True
+    else:
+        template.is_default = False
+    return None
+@admin_bp.route('/step_templates/add', methods=['POST'])
+@login_required
+@admin_required
+def add_step_template():
+    """添加步骤模板"""
+    template = StepTemplate()
+    error = _save_step_template(template)
+    if error:
+        flash(error, 'danger')
+        return redirect(url_for('admin.step_templates'))
+    db.session.add(template)
+    db.session.commit()
+    flash('步骤模板添加成功', 'success')
+    return redirect(url_for('admin.step_templates'))
+@admin_bp.route('/step_templates/edit/<int:template_id>', methods=['POST'])
+@login_required
+@admin_required
+def edit_step_template(template_id):
+    """编辑步骤模板（只影响之后创建的项目）"""
+    template = StepTemplate.query.get_or_404(template_id)
+    error = _save_step_template(template)
+    if error:
+        db.session.rollback()
+        flash(error, 'danger')
+        return redirect(url_for('admin.step_templates'))
+    db.session.commit()
+    flash('步骤模板已更新', 'success')
+    return redirect(url_for('admin.step_templates'))
+@admin_bp.route('/step_templates/delete/<int:template_id>', methods=['POST'])
+@login_required
+@admin_required
+def delete_step_template(template_id):
+    """删除步骤模板（已生成的项目步骤不受影响）"""
+    template = StepTemplate.query.get_or_404(template_id)
+    db.session.delete(template)
+    db.session.commit()
+    flash('步骤模板已删除', 'success')
+    return redirect(url_for('admin.step_templates'))
 # ---------------------- 用户管理 ----------------------
 @admin_bp.route('/users')
 @login_required
@@ -138,15 +215,23 @@ def logs():
 @admin_bp.route('/dashboard')
 @login_required
 @admin_required
+@read_replica
 def dashboard():
     """管理员仪表盘"""
-    total_projects = Project.query.count()
-    total_amount = db.session.query(func.sum(Project.project_amount)).scalar() or 0  # ✅ func 已导入
+    total_projects, total_amount = stats_totals()
     total_columns = DynamicColumn.query.count()
     total_users = User.query.count()
     return render_template('admin/dashboard.html',
                          total_projects=total_projects,
                          total_amount=total_amount,
                          total_columns=total_columns,
-                         total_users=total_users)
+                         total_users=total_users,
+                         pools=pool_stats())
+
+@admin_bp.route('/db_pool')
+@login_required
+@admin_required
+def db_pool():
+    """本进程的数据库连接池状态（JSON，仪表盘定时刷新）"""
+    return jsonify(pool_stats())
 
@@ -10,6 +10,7 @@ auth_bp = Blueprint('auth', __name__)  # 定义蓝图（名称必须与导入一
 from app import db
 from app.models import User
 from app.forms import LoginForm  # 关键：导入登录表单类
+from app.utils.passwords import verify_password, needs_rehash, login_throttle, throttle_limits, VerifierBusy
 @auth_bp.route('/login', methods=['GET', 'POST'])
 def login():
     # 1. 如果已登录，重定向到首页（避免重复登录）
@@ -21,12 +22,28 @@ def login():
     
     # 3. 处理表单提交（POST 请求）
     if form.validate_on_submit():
-        # 查询用户
+        # 限流：窗口内失败次数超限时不再计算哈希
+        limits = throttle_limits(form.username.data, request.remote_addr)
+        wait = login_throttle.retry_after(limits)
+        if wait:
+            flash(f'登录失败次数过多，请 {wait} 秒后再试', 'danger')
+            return render_template('auth/login.html', title='登录', form=form), 429
+        # 查询用户，在线程池中校验密码（用户不存在时同样计算一次哈希）
         user = User.query.filter_by(username=form.username.data).first()
-        # 验证用户和密码
-        if user is None or not user.check_password(form.password.data):
+        try:
+            valid = verify_password(user, form.password.data)
+        except VerifierBusy:
+            flash('登录请求过多，请稍后再试', 'warning')
+            return render_template('auth/login.html', title='登录', form=form), 503
+        if not valid:
+            login_throttle.record_failure(key for key, _ in limits)
             flash('用户名或密码错误', 'danger')
             return redirect(url_for('auth.login'))
+        login_throttle.reset(limits[0][0])
+        # 哈希方法已调整时用新成本重新哈希
+        if needs_rehash(user.password_hash):
+            user.set_password(form.password.data)
+            db.session.commit()
         # 登录用户
         login_user(user, remember=form.remember_me.data)
         # 处理跳转页面
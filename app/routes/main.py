@@ -1,59 +1,54 @@
-from flask import Blueprint, render_template, request
+from flask import Blueprint, render_template, request, current_app
 from flask_login import login_required, current_user
-from sqlalchemy import func, extract
 from datetime import datetime, timedelta
 from app import db
 from app.models import Project
+from app.utils.filters import get_filters, apply_project_filters, filter_signature
+from app.utils.pagination import keyset_paginate
+from app.utils import rollup
+from app.utils.conditional import conditional_view, projects_validator, dashboard_validator
+from app.utils.dynamic_columns import active_columns, load_dynamic_values, format_value
+from app.utils.search import search_projects
+from app.utils.db_routing import read_replica
 # 定义蓝图（避免重复定义）
 main_bp = Blueprint('main', __name__)
 @main_bp.route('/')
 @login_required
+@read_replica
+@conditional_view(projects_validator)
 def index():
     """首页 - 项目列表"""
-    page = request.args.get('page', 1, type=int)
-    projects = Project.query.order_by(Project.created_at.desc()).paginate(
-        page=page, per_page=20, error_out=False
+    filters = get_filters(request.args)
+    projects = keyset_paginate(
+        apply_project_filters(Project.query, filters),
+        cursor=request.args.get('cursor'),
+        page=request.args.get('page', 1, type=int),
+        per_page=current_app.config['PROJECTS_PER_PAGE'],
+        count_key=('projects',) + filter_signature(filters) if current_app.config.get('PAGINATION_SHOW_TOTAL') else None,
+        sort=request.args.get('sort', 'created')
     )
+    dynamic_columns = active_columns()
     return render_template('index.html', 
                          title='项目列表',
                          projects=projects,
-                         pagination=projects)
+                         pagination=projects,
+                         dynamic_columns=dynamic_columns,
+                         dynamic_values=load_dynamic_values([p.id for p in projects.items], dynamic_columns),
+                         format_dynamic=format_value)
 @main_bp.route('/dashboard')
 @login_required
+@read_replica
+@conditional_view(dashboard_validator)
 def dashboard():
     """数据仪表盘（修复返回响应）"""
     now = datetime.now()
-    # 基础统计
-    total_projects = Project.query.count()
-    total_amount = db.session.query(func.sum(Project.project_amount)).scalar() or 0
-    
-    # 按状态统计
-    progress_stats = db.session.query(
-        Project.contract_progress,
-        func.count(Project.id).label('count')
-    ).group_by(Project.contract_progress).all()
-    
-    # 按年份统计项目数量
-    year_stats = db.session.query(
-        extract('year', Project.sign_date).label('year'),
-        func.count(Project.id).label('count')
-    ).group_by(extract('year', Project.sign_date)).order_by('year').all()
-    
-    # 按月份统计（当前年）
-    current_year = datetime.now().year
-    month_stats = db.session.query(
-        extract('month', Project.sign_date).label('month'),
-        func.count(Project.id).label('count')
-    ).filter(
-        extract('year', Project.sign_date) == current_year
-    ).group_by(extract('month', Project.sign_date)).order_by('month').all()
-    
-    # 收款统计
-    payment_stats = db.session.query(
-        Project.payment_status,
-        func.count(Project.id).label('count'),
-        func.sum(Project.project_amount).label('amount')
-    ).group_by(Project.payment_status).all()
+    current_year = now.year
+    # 统计数据全部来自预聚合的 project_stats 汇总表
+    total_projects, total_amount = rollup.stats_totals()
+    progress_stats = rollup.progress_stats()
+    year_stats = rollup.year_stats()
+    month_stats = rollup.month_stats(current_year)
+    payment_stats = rollup.payment_stats()
     
     # 即将到期的维保项目（30天内）
     upcoming_maintenance = Project.query.filter(
@@ -75,3 +70,11 @@ def dashboard():
         current_year=current_year,
         now=now
     )
+@main_bp.route('/search')
+@login_required
+@read_replica
+def search():
+    """全文检索：合同名称、合同编号、甲乙丙方、项目备注，按相关度排序"""
+    q = request.args.get('q', '').strip()
+    results = search_projects(q, page=request.args.get('page', 1, type=int))
+    return render_template('search.html', title='搜索', q=q, results=results)
@@ -1,15 +1,32 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, jsonify, send_file
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, jsonify, send_file, Response, stream_with_context, abort
 from flask_login import login_required, current_user
 from werkzeug.utils import secure_filename
 from flask import current_app
 import os
 import uuid
+from urllib.parse import quote
 import pandas as pd
 from io import BytesIO
 from datetime import datetime, timedelta
 from app import db
-from app.models import Project, ProjectNote, ProjectFile, DynamicColumn, ProjectDynamicValue, ProjectStep
+from app.models import Project, ProjectNote, ProjectFile, DynamicColumn, ProjectDynamicValue, ProjectStep, ImportJob, UploadSession
 from app.utils.decorators import admin_required
+from app.utils.db_routing import read_replica
+from app.utils.filters import get_filters, apply_project_filters, filter_signature
+from app.utils.pagination import keyset_paginate, clear_count_cache
+from app.utils import rollup, chunked_upload
+from app.utils.conditional import conditional_view, projects_validator, project_validator, dashboard_validator
+from app.utils.project_detail import load_project_detail, detail_payload, step_progress, step_to_dict
+from app.utils.step_ops import apply_step_operations, StepOperationError
+from app.utils.step_templates import active_templates, template_steps, add_project_with_steps
+from app.utils.dynamic_columns import active_columns, load_dynamic_values, format_value
+from app.utils.export import export_headers, iter_export_rows, stream_csv, build_xlsx
+from app.utils.file_storage import store_stream, add_project_file, delete_project_files
+from app.utils.file_gc import schedule_file_gc
+from app.utils.file_archive import iter_project_entries, stream_zip, safe_name
+from app.utils.file_serving import send_project_file
+from app.utils.typeahead import suggest, TYPEAHEAD_FIELDS
+from app.utils.import_jobs import active_job_count, create_import_job, submit_import_job, ImportLimitReached
 from sqlalchemy.exc import IntegrityError
 
 
@@ -17,31 +34,53 @@ projects_bp = Blueprint('projects', __name__)
 
 @projects_bp.route('/list', methods=['GET'])
 @login_required
+@read_replica
+@conditional_view(projects_validator)
 def list():
     """项目列表页面"""
-    page = request.args.get('page', 1, type=int)
-    projects = Project.query.order_by(Project.created_at.desc()).paginate(
-        page=page, per_page=20, error_out=False
+    filters = get_filters(request.args)
+    projects = keyset_paginate(
+        apply_project_filters(Project.query, filters),
+        cursor=request.args.get('cursor'),
+        page=request.args.get('page', 1, type=int),
+        per_page=current_app.config['PROJECTS_PER_PAGE'],
+        count_key=('projects',) + filter_signature(filters) if current_app.config.get('PAGINATION_SHOW_TOTAL') else None,
+        sort=request.args.get('sort', 'created')
     )
-    return render_template('projects/list.html', title='项目列表', projects=projects, pagination=projects)
+    dynamic_columns = active_columns()
+    return render_template('projects/list.html', title='项目列表', projects=projects, pagination=projects,
+                           dynamic_columns=dynamic_columns,
+                           dynamic_values=load_dynamic_values([p.id for p in projects.items], dynamic_columns),
+                           format_dynamic=format_value)
 
 @projects_bp.route('/detail/<int:id>')
 @login_required
+@conditional_view(project_validator)
 def detail(id):
     """项目详情页"""
-    project = Project.query.get_or_404(id)
-    notes = project.notes.order_by(ProjectNote.created_at.desc()).all()
-    contract_files = project.files.filter_by(file_type='contract').all()
-    acceptance_files = project.files.filter_by(file_type='acceptance').all()
-    other_files = project.files.filter_by(file_type='other').all()
+    detail = load_project_detail(id)
+    if detail is None:
+        abort(404)
+    files = detail['files']
     
     return render_template('project_detail.html',
-                         title=project.contract_name,
-                         project=project,
-                         notes=notes,
-                         contract_files=contract_files,
-                         acceptance_files=acceptance_files,
-                         other_files=other_files)
+                         title=detail['project'].contract_name,
+                         project=detail['project'],
+                         notes=detail['notes'],
+                         contract_files=files['contract'],
+                         acceptance_files=files['acceptance'],
+                         other_files=files['other'],
+                         payload=detail_payload(detail))
+
+@projects_bp.route('/<int:project_id>/detail_data')
+@login_required
+@conditional_view(project_validator)
+def detail_data(project_id):
+    """详情页数据（项目、备注、分类文件、步骤、进度）一次返回"""
+    detail = load_project_detail(project_id)
+    if detail is None:
+        abort(404)
+    return jsonify(detail_payload(detail))
 
 @projects_bp.route('/create', methods=['GET', 'POST'])
 @login_required
@@ -66,26 +105,10 @@ def create():
                 business_person=request.form.get('business_person'),
                 project_manager=request.form.get('project_manager')
             )
-            db.session.add(project)
-            db.session.commit()
-            
-            # 添加默认步骤
-            default_steps = [
-                ('项目启动', True),
-                ('项目验收', False),
-                ('验收回款', False)
-            ]
-            for i, (title, is_completed) in enumerate(default_steps):
-                step = ProjectStep(
-                    project_id=project.id,
-                    title=title,
-                    is_completed=is_completed,
-                    is_fixed=True,
-                    order=i
-                )
-                db.session.add(step)
-            
+            # 按所选步骤模板在同一事务内批量插入步骤
+            add_project_with_steps(project, template_steps(request.form.get('step_template_id', type=int)))
             db.session.commit()
+            clear_count_cache()
             flash('项目创建成功！', 'success')
             return redirect(url_for('projects.detail', id=project.id))
         except IntegrityError as e:
@@ -96,7 +119,7 @@ def create():
                 flash('数据冲突，请检查输入', 'danger')
             return redirect(url_for('projects.create'))
 
-    return render_template('project_form.html', title='创建项目', project=None)
+    return render_template('project_form.html', title='创建项目', project=None, step_templates=active_templates())
 
 @projects_bp.route('/edit/<int:id>', methods=['GET', 'POST'])
 @login_required
@@ -164,21 +187,16 @@ def delete(id):
         return redirect(url_for('projects.list'))
     
     try:
-        # 1. 清理关联文件
-        project_files = ProjectFile.query.filter_by(project_id=id).all()  # 使用 id 筛选
-        for file in project_files:
-            file_path = os.path.join(
-                current_app.root_path, 
-                'static', 'uploads', 'projects', 
-                str(id), file.filename  # 使用 id 构建路径
-            )
-            if os.path.exists(file_path):
-                os.remove(file_path)
-            db.session.delete(file)
+        # 1. 删除文件记录、释放内容引用、放弃未完成的上传（磁盘文件进入删除队列）
+        delete_project_files(ProjectFile.query.filter_by(project_id=id).all())
+        for upload in UploadSession.query.filter_by(project_id=id).all():
+            chunked_upload.abort_upload(upload)
         
-        # 2. 删除项目记录
+        # 2. 删除项目记录（步骤、备注、动态列值随项目级联删除）
         db.session.delete(project)
         db.session.commit()
+        schedule_file_gc()
+        clear_count_cache()
         flash(f'项目「{project.contract_name}」已成功删除', 'success')
     
     except Exception as e:
@@ -202,65 +220,19 @@ def import_excel():
             return redirect(request.url)
         
         if file and file.filename.endswith(('.xlsx', '.xls')):
+            # 先做一次不加锁的检查，已满时不必暂存文件；create_import_job 内再加锁确认
+            if active_job_count() >= current_app.config.get('IMPORT_MAX_ACTIVE_JOBS', 2):
+                flash('当前导入任务较多，请稍后再试', 'warning')
+                return redirect(request.url)
             try:
-                excel_data = pd.read_excel(BytesIO(file.read()))
-                
-                required_columns = ['合同项目', '签订日期', '合同编号', '甲方', '乙方']
-                missing_columns = [col for col in required_columns if col not in excel_data.columns]
-                if missing_columns:
-                    flash(f'Excel文件缺少必需列: {", ".join(missing_columns)}', 'danger')
-                    return redirect(request.url)
-                
-                success_count = 0
-                error_count = 0
-                errors = []
-                
-                for index, row in excel_data.iterrows():
-                    try:
-                        existing_project = Project.query.filter_by(
-                            contract_number=str(row['合同编号'])
-                        ).first()
-                        if existing_project:
-                            errors.append(f"第{index+2}行: 合同编号 {row['合同编号']} 已存在")
-                            error_count += 1
-                            continue
-                        
-                        project = Project(
-                            contract_name=str(row['合同项目']),
-                            sign_date=pd.to_datetime(row['签订日期']).date() if pd.notna(row['签订日期']) else None,
-                            contract_number=str(row['合同编号']),
-                            contract_progress=str(row.get('合同进度', '未开始')),
-                            party_a=str(row['甲方']),
-                            party_b=str(row['乙方']),
-                            party_c=str(row.get('丙方', '')) if pd.notna(row.get('丙方')) else None,
-                            project_amount=float(row.get('项目金额', 0)) if pd.notna(row.get('项目金额')) else 0.0,
-                            invoice_status=str(row.get('发票开具情况', '未开具')),
-                            payment_status=str(row.get('收款情况', '未收款')),
-                            supply_status=str(row.get('供货情况', '未供货')),
-                            acceptance_status=str(row.get('验收情况', '未验收')),
-                            maintenance_time=pd.to_datetime(row.get('维保时间')).date() if pd.notna(row.get('维保时间')) else None,
-                            business_person=str(row.get('商务人员', '')) if pd.notna(row.get('商务人员')) else None,
-                            project_manager=str(row.get('项目负责人', '')) if pd.notna(row.get('项目负责人')) else None
-                        )
-                        db.session.add(project)
-                        success_count += 1
-                        
-                    except Exception as e:
-                        errors.append(f"第{index+2}行: {str(e)}")
-                        error_count += 1
-                
-                db.session.commit()
-                
-                if success_count > 0:
-                    flash(f'成功导入 {success_count} 个项目', 'success')
-                if error_count > 0:
-                    flash(f'导入失败 {error_count} 个项目', 'danger')
-                    for error in errors[:5]:
-                        flash(error, 'warning')
-                
-                return redirect(url_for('main.index'))
-                
+                job = create_import_job(file, current_user.id)
+                submit_import_job(job)
+                return redirect(url_for('projects.import_job', job_id=job.id))
+            except ImportLimitReached:
+                flash('当前导入任务较多，请稍后再试', 'warning')
+                return redirect(request.url)
             except Exception as e:
+                db.session.rollback()
                 flash(f'处理Excel文件时出错: {str(e)}', 'danger')
                 return redirect(request.url)
         else:
@@ -269,47 +241,57 @@ def import_excel():
     
     return render_template('import_excel.html', title='Excel导入')
 
+def _get_import_job(job_id):
+    """只有发起人和管理员可以查看导入任务（文件名、行错误中含单元格内容）"""
+    job = db.session.get(ImportJob, job_id)
+    if job is None or (job.created_by != current_user.id and not current_user.is_admin):
+        abort(404)
+    return job
+
+@projects_bp.route('/import_jobs/<int:job_id>')
+@login_required
+def import_job(job_id):
+    """导入任务结果页"""
+    return render_template('import_job.html', title='导入结果', job=_get_import_job(job_id))
+
+@projects_bp.route('/import_jobs/<int:job_id>/status')
+@login_required
+def import_job_status(job_id):
+    """导入任务进度（JSON）"""
+    return jsonify(_get_import_job(job_id).to_dict())
+
+@projects_bp.route('/typeahead')
+@login_required
+def typeahead():
+    """输入联想：?field=party_a|business_person|project_manager&q=前缀，返回匹配的取值列表"""
+    field = request.args.get('field')
+    if field not in TYPEAHEAD_FIELDS:
+        return jsonify({'error': '不支持的字段'}), 400
+    response = jsonify(suggest(field, request.args.get('q', '')[:50]))
+    response.headers['Cache-Control'] = 'private, max-age=60'
+    return response
+
 @projects_bp.route('/export_excel')
 @login_required
+@read_replica
 def export_excel():
-    """导出项目数据为Excel"""
-    projects = Project.query.order_by(Project.created_at.desc()).all()
-    
-    data = []
-    headers = [
-        '合同项目', '签订日期', '合同编号', '合同进度', '甲方', '乙方', '丙方',
-        '项目金额', '发票开具情况', '收款情况', '供货情况', '验收情况',
-        '维保时间', '商务人员', '项目负责人'
-    ]
-    data.append(headers)
-    
-    for project in projects:
-        row = [
-            project.contract_name,
-            project.sign_date.strftime('%Y-%m-%d') if project.sign_date else '',
-            project.contract_number,
-            project.contract_progress,
-            project.party_a,
-            project.party_b,
-            project.party_c or '',
-            project.project_amount,
-            project.invoice_status,
-            project.payment_status,
-            project.supply_status,
-            project.acceptance_status,
-            project.maintenance_time.strftime('%Y-%m-%d') if project.maintenance_time else '',
-            project.business_person or '',
-            project.project_manager or ''
-        ]
-        data.append(row)
-    
-    df = pd.DataFrame(data[1:], columns=data[0])
-    
-    import tempfile
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp:
-        df.to_excel(tmp.name, index=False, engine='openpyxl')
-        return send_file(tmp.name, as_attachment=True, 
-                        download_name=f'项目数据_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx')
+    """导出项目数据（?format=csv 导出 CSV，默认 Excel；支持与列表相同的筛选参数）"""
+    chunk_size = current_app.config.get('EXPORT_CHUNK_SIZE', 1000)
+    filters = get_filters(request.args)
+    dynamic_columns = active_columns()
+    headers = export_headers(dynamic_columns)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    if request.args.get('format') == 'csv':
+        rows = iter_export_rows(chunk_size, filters, dynamic_columns)
+        response = Response(stream_with_context(stream_csv(rows, headers)), mimetype='text/csv')
+        response.headers['Content-Disposition'] = "attachment; filename*=UTF-8''" + quote(f'项目数据_{timestamp}.csv')
+        return response
+
+    spooled = build_xlsx(iter_export_rows(chunk_size, filters, dynamic_columns), headers)
+    return send_file(spooled, as_attachment=True,
+                     mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+                     download_name=f'项目数据_{timestamp}.xlsx')
 
 @projects_bp.route('/<int:project_id>/add_note', methods=['POST'])
 @login_required
@@ -340,7 +322,7 @@ def add_note(project_id):
 
 # 辅助函数：检查文件类型是否允许上传
 def allowed_file(filename):
-    allowed_extensions = {'txt', 'pdf', 'doc', 'docx', 'xls', 'xlsx', 'ppt', 'pptx', 'jpg', 'jpeg', 'png', 'gif'}
+    allowed_extensions = {'txt', 'pdf', 'doc', 'docx', 'xls', 'xlsx', 'ppt', 'pptx', 'jpg', 'jpeg', 'png', 'gif', 'mp4', 'mov'}
     return '.' in filename and \
     filename.rsplit('.', 1)[1].lower() in allowed_extensions
 
@@ -358,24 +340,16 @@ def upload_file(project_id):
         return redirect(url_for('projects.detail', id=project_id))
     
     if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        upload_folder = os.path.join(current_app.root_path, 'static', 'uploads', 'projects', str(project_id))
-        os.makedirs(upload_folder, exist_ok=True)
-        file_path = os.path.join(upload_folder, filename)
-        file.save(file_path)
-        
-        new_file = ProjectFile(
-            project_id=project_id,
-            filename=filename,
-            original_filename=file.filename,
-            file_type=request.form.get('file_type', 'other'),
-            file_path=file_path,
-            uploaded_by=current_user.id
-        )
-        db.session.add(new_file)
-        db.session.commit()
-        
-        flash('文件上传成功！', 'success')
+        try:
+            # 边写边算 SHA-256，相同内容只保存一份
+            sha256, size, file_path = store_stream(file.stream)
+            add_project_file(project_id, file.filename, request.form.get('file_type', 'other'),
+                             sha256, size, file_path, current_user)
+            db.session.commit()
+            flash('文件上传成功！', 'success')
+        except Exception as e:
+            db.session.rollback()
+            flash(f'文件上传失败：{str(e)}', 'danger')
     else:
         flash('不支持的文件类型', 'danger')
     
@@ -389,19 +363,9 @@ def delete_file(file_id):
     project_id = file.project_id
     
     try:
-        file_path = os.path.join(
-            current_app.root_path, 
-            'static', 
-            'uploads', 
-            'projects', 
-            str(project_id), 
-            file.filename
-        )
-        if os.path.exists(file_path):
-            os.remove(file_path)
-        
-        db.session.delete(file)
+        delete_project_files([file])
         db.session.commit()
+        schedule_file_gc()
         flash('文件已成功删除', 'success')
     
     except Exception as e:
@@ -410,36 +374,150 @@ def delete_file(file_id):
     
     return redirect(url_for('projects.detail', id=project_id))
 
+# ================ 大文件分块上传 ================
+
+def _upload_error(e):
+    return jsonify({'error': str(e)}), e.status
+
+def _get_upload(upload_id):
+    """只有发起人可以续传 / 完成 / 放弃自己的上传会话"""
+    upload = db.session.get(UploadSession, upload_id)
+    if upload is None or upload.created_by != current_user.id:
+        abort(404)
+    return upload
+
+@projects_bp.route('/<int:project_id>/uploads', methods=['POST'])
+@login_required
+def create_upload(project_id):
+    """创建分块上传会话：JSON {filename, size, file_type, sha256（可选）}"""
+    Project.query.get_or_404(project_id)
+    data = request.get_json(silent=True) or {}
+    filename = str(data.get('filename') or '')
+    if not allowed_file(filename):
+        return jsonify({'error': '不支持的文件类型'}), 400
+    chunked_upload.expire_upload_sessions()
+    try:
+        upload, file = chunked_upload.create_upload(
+            project_id, filename, data.get('file_type') or 'other', data.get('size'), data.get('sha256'), current_user
+        )
+        db.session.commit()
+    except chunked_upload.UploadError as e:
+        db.session.rollback()
+        return _upload_error(e)
+    if file is not None:
+        # 相同内容已存储，无需上传分块
+        return jsonify({'complete': True, 'file_id': file.id}), 201
+    payload = upload.to_dict()
+    payload['chunk_size'] = current_app.config.get('UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024)
+    return jsonify(payload), 201
+
+@projects_bp.route('/uploads/<upload_id>', methods=['GET'])
+@login_required
+def upload_status(upload_id):
+    """上传进度（续传时从返回的 offset 开始）"""
+    return jsonify(_get_upload(upload_id).to_dict())
+
+@projects_bp.route('/uploads/<upload_id>', methods=['PUT'])
+@login_required
+def upload_chunk(upload_id):
+    """写入一个分块：?offset=N，请求体为分块原始字节"""
+    upload = _get_upload(upload_id)
+    offset = request.args.get('offset', type=int)
+    if offset is None:
+        return jsonify({'error': '缺少 offset 参数'}), 400
+    try:
+        new_offset = chunked_upload.append_chunk(upload, offset, request.stream, request.content_length)
+    except chunked_upload.UploadError as e:
+        db.session.rollback()
+        # 会话可能在此期间被放弃或过期清理
+        current = db.session.get(UploadSession, upload_id)
+        if current is None:
+            abort(404)
+        response, status = _upload_error(e)
+        response.headers['Upload-Offset'] = str(current.received_size)
+        return response, status
+    return jsonify({'offset': new_offset})
+
+@projects_bp.route('/uploads/<upload_id>/complete', methods=['POST'])
+@login_required
+def complete_upload(upload_id):
+    """全部分块写入后完成上传：校验 SHA-256 并生成项目文件"""
+    upload = _get_upload(upload_id)
+    try:
+        file = chunked_upload.complete_upload(upload, current_user)
+        db.session.commit()
+    except chunked_upload.UploadError as e:
+        db.session.rollback()
+        return _upload_error(e)
+    return jsonify({'complete': True, 'file_id': file.id})
+
+@projects_bp.route('/uploads/<upload_id>', methods=['DELETE'])
+@login_required
+def abort_upload(upload_id):
+    """放弃上传"""
+    chunked_upload.abort_upload(_get_upload(upload_id))
+    db.session.commit()
+    schedule_file_gc()
+    return '', 204
+
+def _archive_response(entries, name):
+    response = Response(stream_with_context(stream_zip(entries)), mimetype='application/zip')
+    response.headers['Content-Disposition'] = "attachment; filename*=UTF-8''" + quote(f'{safe_name(name)}.zip')
+    return response
+
+@projects_bp.route('/<int:project_id>/files/archive')
+@login_required
+def project_files_archive(project_id):
+    """打包下载单个项目的全部附件（ZIP 流）"""
+    project = Project.query.get_or_404(project_id)
+    return _archive_response(iter_project_entries([project.id], project_folders=False),
+                             f'{project.contract_number}_{project.contract_name}_附件')
+
+@projects_bp.route('/files/archive')
+@login_required
+def files_archive():
+    """打包下载多个项目的附件：?ids=1&ids=2 指定项目，否则按与列表相同的筛选条件"""
+    limit = current_app.config.get('ARCHIVE_MAX_PROJECTS', 1000)
+    ids = request.args.getlist('ids', type=int)
+    if not ids:
+        query = apply_project_filters(db.session.query(Project.id), get_filters(request.args))
+        ids = [r[0] for r in query.order_by(Project.created_at.desc(), Project.id.desc()).limit(limit + 1)]
+    if not ids:
+        flash('没有符合条件的项目', 'warning')
+        return redirect(url_for('projects.list'))
+    if len(ids) > limit:
+        flash(f'一次最多打包 {limit} 个项目，请缩小筛选范围', 'warning')
+        return redirect(url_for('projects.list', **request.args))
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return _archive_response(iter_project_entries(ids), f'项目附件_{timestamp}')
+
+@projects_bp.route('/files/<int:file_id>')
+@login_required
+def download_file(file_id):
+    """查看 / 下载项目文件（?download=1 作为附件下载），支持 Range 与 If-None-Match"""
+    file = ProjectFile.query.get_or_404(file_id)
+    # 与详情页相同的可见性：登录用户可访问所属项目存在的文件
+    if db.session.get(Project, file.project_id) is None:
+        abort(404)
+    response = send_project_file(file, as_attachment=bool(request.args.get('download')))
+    if response is None:
+        abort(404)
+    return response
+
 # ================ 项目进度管理路由（只保留一份） ================
 
 @projects_bp.route('/<int:project_id>/steps', methods=['GET'])
 @login_required
 def get_steps(project_id):
     """获取项目步骤"""
-    steps = ProjectStep.query.filter_by(project_id=project_id).order_by(ProjectStep.order).all()
-    return jsonify([{
-        'id': step.id,
-        'title': step.title,
-        'is_completed': step.is_completed,
-        'is_fixed': step.is_fixed
-    } for step in steps])
+    steps = ProjectStep.query.filter_by(project_id=project_id).order_by(ProjectStep.order, ProjectStep.id).all()
+    return jsonify([step_to_dict(step) for step in steps])
 
 @projects_bp.route('/<int:project_id>/progress', methods=['GET'])
 @login_required
 def get_progress(project_id):
     """获取项目进度"""
-    total_steps = ProjectStep.query.filter_by(project_id=project_id).count()
-    completed_steps = ProjectStep.query.filter_by(project_id=project_id, is_completed=True).count()
-    
-    percent = 0
-    if total_steps > 0:
-        percent = int((completed_steps / total_steps) * 100)
-    
-    return jsonify({
-        'total': total_steps,
-        'completed': completed_steps,
-        'percent': percent
-    })
+    return jsonify(step_progress(project_id))
 
 @projects_bp.route('/<int:project_id>/steps/add', methods=['POST'])
 @login_required
@@ -450,22 +528,41 @@ def add_step(project_id):
         return jsonify({'error': '步骤标题不能为空'}), 400
     
     try:
-        max_order = db.session.query(db.func.max(ProjectStep.order)).filter_by(project_id=project_id).scalar() or 0
-        
-        step = ProjectStep(
-            project_id=project_id,
-            title=title,
-            is_fixed=False,
-            order=max_order + 1
-        )
-        db.session.add(step)
+        steps, refs = apply_step_operations(project_id, [{'op': 'add', 'title': title, 'ref': 'new'}], current_user)
         db.session.commit()
         
-        return jsonify({'success': True, 'id': step.id})
+        return jsonify({'success': True, 'id': refs['new'].id, 'progress': step_progress(project_id)})
+    except StepOperationError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), e.status
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@projects_bp.route('/<int:project_id>/steps/batch', methods=['POST'])
+@login_required
+def batch_steps(project_id):
+    """批量执行步骤操作（add / toggle / rename / reorder / delete），全部成功才提交"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': '请求体必须是 JSON 对象'}), 400
+    try:
+        steps, refs = apply_step_operations(project_id, data.get('ops'), current_user)
+        db.session.commit()
+        return jsonify({
+            'success': True,
+            'steps': [step_to_dict(step) for step in steps],
+            'refs': {ref: step.id for ref, step in refs.items()},
+            'progress': step_progress(project_id)
+        })
+    except StepOperationError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), e.status
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception(e)
+        return jsonify({'error': '保存失败'}), 500
+
 @projects_bp.route('/steps/toggle/<int:step_id>', methods=['POST'])
 @login_required
 def toggle_step(step_id):
@@ -475,7 +572,8 @@ def toggle_step(step_id):
     try:
         step.is_completed = not step.is_completed
         db.session.commit()
-        return jsonify({'success': True, 'is_completed': step.is_completed})
+        return jsonify({'success': True, 'is_completed': step.is_completed,
+                        'progress': step_progress(step.project_id)})
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -488,17 +586,16 @@ def delete_step(step_id):
     if step.title == '项目验收完成':
         return jsonify({'error': '系统固定步骤，不可删除'}), 403
 
-    # 2. 简单权限：只有创建人或管理员可删，自行扩展
-    if step.creator_id != current_user.id and not current_user.is_admin:
+    # 2. 简单权限：只有项目创建人或管理员可删，自行扩展
+    if step.project.created_by != current_user.id and not current_user.is_admin:
         return jsonify({'error': '无权删除'}), 403
 
     project_id = step.project_id
     try:
         db.session.delete(step)
         db.session.commit()
-        # 3. 重新计算进度
-        ProjectStep.recalc_progress(project_id)   # 见下方模型方法
-        return jsonify({'result': 'ok'})
+        # 3. 进度计数器已在同一事务内更新
+        return jsonify({'result': 'ok', 'progress': step_progress(project_id)})
     except Exception as e:
         db.session.rollback()
         current_app.logger.exception(e)
@@ -506,44 +603,24 @@ def delete_step(step_id):
         
 @projects_bp.route('/dashboard')
 @login_required
+@read_replica
+@conditional_view(dashboard_validator)
 def dashboard():
-    from sqlalchemy import func, extract
-    from datetime import datetime, timedelta
-
     now = datetime.now()
 
-    # 1. 顶部卡片数据
-    total_projects   = Project.query.count()
-    total_amount     = db.session.query(func.sum(Project.project_amount)).scalar() or 0
+    # 1. 顶部卡片数据（来自 project_stats 汇总表）
+    total_projects, total_amount = rollup.stats_totals()
     upcoming_maint   = Project.query.filter(
                             Project.maintenance_time.between(
                                 now.date(),
                                 now.date() + timedelta(days=30)
                             )).all()
-    payment_kinds    = db.session.query(Project.payment_status).distinct().all()
 
     # 2. 图表数据
-    progress_stats = db.session.query(
-                        Project.contract_progress,
-                        func.count(Project.id).label('count')
-                     ).group_by(Project.contract_progress).all()
-
-    year_stats = db.session.query(
-                    extract('year', Project.sign_date).label('year'),
-                    func.count(Project.id).label('count')
-                 ).filter(Project.sign_date >= now.replace(year=now.year-4, month=1, day=1))\
-                  .group_by('year').order_by('year').all()
-
-    month_stats = db.session.query(
-                    extract('month', Project.sign_date).label('month'),
-                    func.count(Project.id).label('count')
-                  ).filter(extract('year', Project.sign_date) == now.year)\
-                   .group_by('month').order_by('month').all()
-
-    payment_stats = db.session.query(
-                        Project.payment_status,
-                        func.sum(Project.project_amount).label('amount')
-                      ).group_by(Project.payment_status).all()
+    progress_stats = rollup.progress_stats()
+    year_stats     = rollup.year_stats(since_year=now.year - 4)
+    month_stats    = rollup.month_stats(now.year)
+    payment_stats  = rollup.payment_stats()
 
     return render_template('dashboard.html',
                            total_projects=total_projects,
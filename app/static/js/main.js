@@ -188,6 +188,37 @@ document.addEventListener('DOMContentLoaded', function() {
     if (progressBar && steps.length > 0) {
         updateProgress();
     }
+
+    // 输入联想（甲方 / 商务人员 / 项目负责人）：停止输入 150ms 后请求，结果填入 datalist
+    document.querySelectorAll('input[data-typeahead]').forEach(function(input, index) {
+        const list = document.createElement('datalist');
+        list.id = 'typeahead-' + index;
+        input.parentNode.appendChild(list);
+        input.setAttribute('list', list.id);
+
+        let timer = null;
+        let lastQuery = null;
+        input.addEventListener('input', function() {
+            clearTimeout(timer);
+            const q = input.value.trim();
+            if (!q || q === lastQuery) return;
+            timer = setTimeout(function() {
+                lastQuery = q;
+                const params = new URLSearchParams({field: input.dataset.typeahead, q: q});
+                fetch('/projects/typeahead?' + params)
+                    .then(function(res) { return res.ok ? res.json() : []; })
+                    .then(function(values) {
+                        if (input.value.trim() !== q) return;
+                        list.replaceChildren(...values.map(function(value) {
+                            const option = document.createElement('option');
+                            option.value = value;
+                            return option;
+                        }));
+                    })
+                    .catch(function() {});
+            }, 150);
+        });
+    });
 });
 // 工具函数
 function formatDate(dateString) {
@@ -0,0 +1,156 @@
+"""大文件分块上传：init → 按偏移量 PUT 分块 → complete
+
+- 每个分块是一个独立的短请求（不超过 UPLOAD_CHUNK_SIZE），连接中断后按 GET 返回的 offset 续传
+- 分块按偏移量写入临时文件，received_size 用条件 UPDATE 推进，并发或重复的分块返回 409
+- complete 时重新计算 SHA-256（与客户端声明的值比对）后转入内容存储，生成 ProjectFile
+- init 时声明的 sha256 已存在于内容存储时直接完成，不需要上传任何分块
+- 超过 UPLOAD_SESSION_TTL 没有新分块的会话由 expire_upload_sessions 清理
+"""
+import hashlib
+import re
+import uuid
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import update
+from app import db
+from app.models import FileBlob, UploadSession
+from app.utils.file_gc import queue_file_removal, schedule_file_gc
+from app.utils.file_storage import CHUNK_SIZE, acquire_blob, add_project_file, blob_path, commit_temp, temp_path
+
+SHA256_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+
+class UploadError(ValueError):
+    """分块上传请求无效，status 为返回的 HTTP 状态码"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def expire_upload_sessions(limit=100):
+    """删除过期的未完成会话及其临时文件，返回删除数"""
+    ttl = current_app.config.get('UPLOAD_SESSION_TTL', 24 * 3600)
+    expired = UploadSession.query.filter(
+        UploadSession.updated_at < datetime.utcnow() - timedelta(seconds=ttl)
+    ).order_by(UploadSession.updated_at).limit(limit).all()
+    for upload in expired:
+        abort_upload(upload)
+    db.session.commit()
+    if expired:
+        schedule_file_gc()
+    return len(expired)
+
+
+def create_upload(project_id, filename, file_type, size, sha256, user):
+    """创建上传会话（调用方负责 commit）；返回 (会话, None)，内容已存在时返回 (None, ProjectFile)"""
+    max_size = current_app.config.get('UPLOAD_MAX_FILE_SIZE', 4 * 1024 ** 3)
+    if not isinstance(size, int) or isinstance(size, bool) or size <= 0:
+        raise UploadError('文件大小无效')
+    if size > max_size:
+        raise UploadError(f'文件不能超过 {max_size // 1024 ** 2} MB', 413)
+    if sha256 is not None:
+        sha256 = str(sha256).lower()
+        if not SHA256_PATTERN.match(sha256):
+            raise UploadError('sha256 格式无效')
+        blob = db.session.get(FileBlob, sha256)
+        if blob is not None and blob.size == size:
+            acquire_blob(sha256, size)
+            return None, add_project_file(project_id, filename, file_type, sha256, size, blob_path(sha256), user)
+
+    path = temp_path()
+    open(path, 'wb').close()
+    upload = UploadSession(
+        id=uuid.uuid4().hex,
+        project_id=project_id,
+        original_filename=filename,
+        file_type=file_type,
+        total_size=size,
+        sha256=sha256,
+        temp_path=path,
+        created_by=user.id
+    )
+    db.session.add(upload)
+    return upload, None
+
+
+def append_chunk(upload, offset, stream, length):
+    """把请求体写入临时文件的 offset 处并提交进度，返回新的 offset"""
+    chunk_limit = current_app.config.get('UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024)
+    if offset != upload.received_size:
+        raise UploadError(f'偏移量不匹配，应从 {upload.received_size} 继续', 409)
+    if not length:
+        raise UploadError('缺少 Content-Length 或分块为空', 411)
+    if length > chunk_limit:
+        raise UploadError(f'分块不能超过 {chunk_limit} 字节', 413)
+    if offset + length > upload.total_size:
+        raise UploadError('分块超出文件大小')
+
+    written = 0
+    with open(upload.temp_path, 'r+b') as out:
+        out.seek(offset)
+        try:
+            while written < length:
+                data = stream.read(min(CHUNK_SIZE, length - written))
+                if not data:
+                    break
+                out.write(data)
+                written += len(data)
+        finally:
+            if written != length:
+                out.truncate(offset)
+    if written != length:
+        raise UploadError('分块数据不完整，请从原偏移量重试')
+
+    # 条件更新：同一偏移量的重复 / 并发分块只有一个生效
+    updated = db.session.execute(
+        update(UploadSession)
+        .where(UploadSession.id == upload.id, UploadSession.received_size == offset)
+        .values(received_size=offset + length, updated_at=datetime.utcnow())
+    ).rowcount
+    db.session.commit()
+    if not updated:
+        raise UploadError('分块已被其他请求写入，请查询进度后继续', 409)
+    return offset + length
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for data in iter(lambda: source.read(CHUNK_SIZE), b''):
+            digest.update(data)
+    return digest.hexdigest()
+
+
+def complete_upload(upload, user):
+    """校验完整性并转入内容存储（调用方负责 commit），返回 ProjectFile；校验失败时丢弃会话"""
+    # 锁定会话行：同一会话并发的 complete 请求排队，后到的请求看到会话已删除
+    upload = UploadSession.query.filter_by(id=upload.id).with_for_update().populate_existing().first()
+    if upload is None:
+        raise UploadError('上传会话不存在或已完成', 404)
+    if upload.received_size != upload.total_size:
+        raise UploadError(f'文件未传完（{upload.received_size}/{upload.total_size}）', 409)
+    try:
+        sha256 = _file_digest(upload.temp_path)
+    except FileNotFoundError:
+        # 不支持行锁的数据库（SQLite）上另一个请求已完成或放弃了该会话
+        raise UploadError('上传会话已完成或已放弃', 409)
+    if upload.sha256 and upload.sha256 != sha256:
+        abort_upload(upload)
+        db.session.commit()
+        schedule_file_gc()
+        raise UploadError('文件校验失败，请重新上传', 422)
+    try:
+        path = commit_temp(upload.temp_path, sha256, upload.total_size)
+    except FileNotFoundError:
+        raise UploadError('上传会话已完成或已放弃', 409)
+    file = add_project_file(upload.project_id, upload.original_filename, upload.file_type,
+                            sha256, upload.total_size, path, user)
+    db.session.delete(upload)
+    return file
+
+
+def abort_upload(upload):
+    """放弃上传：删除会话，临时文件加入删除队列（调用方负责 commit 后调用 schedule_file_gc）"""
+    db.session.delete(upload)
+    queue_file_removal(upload.temp_path)
@@ -0,0 +1,105 @@
+"""条件 GET（ETag / Last-Modified）：校验值只用索引查询得到，命中时直接 304，不查 ORM 对象也不渲染模板"""
+import hashlib
+import time
+from datetime import date, datetime
+from functools import wraps
+from flask import current_app, make_response, request, session, abort
+from flask_login import current_user
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+from app import db
+from app.models import Project, ProjectNote, ProjectFile, ProjectStep, ProjectStat, ProjectDynamicValue
+from app.utils.dynamic_columns import registry_version
+
+# 子表变化时要刷新所属项目的 updated_at（项目 updated_at 即详情页版本号）
+CHILD_MODELS = (ProjectNote, ProjectFile, ProjectStep, ProjectDynamicValue)
+
+
+def _touch_projects(session, flush_context):
+    project_ids = {
+        obj.project_id
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+        if isinstance(obj, CHILD_MODELS) and obj.project_id
+    }
+    if project_ids:
+        session.connection().execute(
+            Project.__table__.update()
+            .where(Project.__table__.c.id.in_(project_ids))
+            .values(updated_at=datetime.utcnow())
+        )
+
+
+def register_touch_events():
+    """注册子表变更刷新项目版本的事件（重复调用无副作用）"""
+    if not event.contains(Session, 'after_flush', _touch_projects):
+        event.listen(Session, 'after_flush', _touch_projects)
+
+
+def projects_validator(**kwargs):
+    """列表页：max(updated_at) 走 ix_projects_updated_at，总数取自汇总表，动态列取自进程内注册表"""
+    max_updated = db.session.query(func.max(Project.updated_at)).scalar()
+    total = db.session.query(func.coalesce(func.sum(ProjectStat.project_count), 0)).scalar()
+    return (max_updated, total, registry_version()), None
+
+
+def dashboard_validator(**kwargs):
+    """仪表盘：同列表页，另外按天变化（维保剩余天数、当前年份）"""
+    parts, _ = projects_validator()
+    return parts + (date.today(),), None
+
+
+def project_validator(id=None, project_id=None, **kwargs):
+    """详情页：主键查 updated_at（备注/文件/步骤变化时会同步刷新）"""
+    updated_at = db.session.query(Project.updated_at).filter(Project.id == (id or project_id)).scalar()
+    if updated_at is None:
+        abort(404)
+    return (updated_at,), updated_at
+
+
+def _csrf_bucket():
+    # 页面里带有 CSRF 令牌，缓存不能比令牌有效期活得更久
+    limit = current_app.config.get('WTF_CSRF_TIME_LIMIT') or 3600
+    return int(time.time() // max(limit // 2, 1))
+
+
+def _make_etag(parts):
+    raw = repr((
+        request.endpoint, request.full_path,
+        current_user.get_id(), getattr(current_user, 'is_admin', False),
+        _csrf_bucket(),
+    ) + tuple(parts))
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def conditional_view(validator):
+    """视图装饰器：validator(**view_args) 返回 (校验元组, last_modified 或 None)"""
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            # 有待显示的 flash 消息时必须重新渲染
+            if request.method != 'GET' or session.get('_flashes'):
+                return f(*args, **kwargs)
+
+            parts, last_modified = validator(**kwargs)
+            etag = _make_etag(parts)
+            if last_modified is not None:
+                last_modified = last_modified.replace(microsecond=0)
+
+            not_modified = False
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains(etag)
+            elif last_modified is not None and request.if_modified_since:
+                not_modified = request.if_modified_since.replace(tzinfo=None) >= last_modified
+
+            if not_modified:
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(f(*args, **kwargs))
+            response.set_etag(etag)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
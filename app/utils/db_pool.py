@@ -0,0 +1,123 @@
+"""数据库连接池：引擎参数按配置组装，连接池记录本进程的取连接耗时 / 超时 / 失效次数
+
+池参数（pool_size / max_overflow / pool_recycle / pool_pre_ping / pool_timeout）在 Config.SQLALCHEMY_ENGINE_OPTIONS
+中配置，可用 DB_POOL_* 环境变量覆盖；统计数据只反映当前进程，多进程部署时每个 worker 各自一份。
+"""
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+from app import db
+
+POOL_OPTION_KEYS = ('pool_size', 'max_overflow', 'pool_recycle', 'pool_timeout')
+
+
+class PoolMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidations = 0
+
+    def record_wait(self, seconds):
+        with self.lock:
+            self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def increment(self, name):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                'checkouts': self.checkouts,
+                'wait_avg_ms': round(self.wait_total * 1000 / self.checkouts, 2) if self.checkouts else 0,
+                'wait_max_ms': round(self.wait_max * 1000, 2),
+                'timeouts': self.timeouts,
+                'connects': self.connects,
+                'invalidations': self.invalidations,
+            }
+
+
+class MeteredQueuePool(QueuePool):
+    """QueuePool + 取连接耗时（含排队与新建连接）、超时、新建与失效（pre_ping 检测到断开等）计数"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+        event.listen(self, 'connect', lambda *args: self.metrics.increment('connects'))
+        event.listen(self, 'invalidate', lambda *args: self.metrics.increment('invalidations'))
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.increment('timeouts')
+            raise
+        finally:
+            self.metrics.record_wait(time.perf_counter() - start)
+
+
+def _is_memory_sqlite(uri):
+    return uri.startswith('sqlite') and (':memory:' in uri or uri.rstrip('/') in ('sqlite:', 'sqlite:/'))
+
+
+def _engine_options(uri, options):
+    options = dict(options)
+    if _is_memory_sqlite(str(uri or '')):
+        for key in POOL_OPTION_KEYS:
+            options.pop(key, None)
+    else:
+        options.setdefault('poolclass', MeteredQueuePool)
+    return options
+
+
+def configure_engine_options(app):
+    """在 db.init_app 之前调用：补上带统计的连接池类；内存 SQLite 不使用连接池参数
+
+    Flask-SQLAlchemy 不会把 SQLALCHEMY_ENGINE_OPTIONS 用到 SQLALCHEMY_BINDS 上，这里把字符串形式的 bind
+    展开成同样的连接池参数。
+    """
+    base = app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {}
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = _engine_options(app.config.get('SQLALCHEMY_DATABASE_URI'), base)
+    binds = {}
+    for key, value in (app.config.get('SQLALCHEMY_BINDS') or {}).items():
+        if not isinstance(value, dict):
+            value = {'url': value}
+        binds[key] = _engine_options(value['url'], {**base, **value})
+    app.config['SQLALCHEMY_BINDS'] = binds
+
+
+def pool_stats():
+    """每个引擎（bind）的连接池状态，供管理后台展示"""
+    stats = []
+    for bind_key, engine in db.engines.items():
+        pool = engine.pool
+        item = {
+            'bind': bind_key or 'default',
+            'url': engine.url.render_as_string(hide_password=True),
+            'pool_class': type(pool).__name__,
+        }
+        if isinstance(pool, QueuePool):
+            item.update({
+                'size': pool.size(),
+                'checked_in': pool.checkedin(),
+                'checked_out': pool.checkedout(),
+                'overflow': max(pool.overflow(), 0),
+                'max_overflow': pool._max_overflow,
+                'timeout': pool.timeout(),
+                'recycle': pool._recycle,
+                'pre_ping': pool._pre_ping,
+            })
+        metrics = getattr(pool, 'metrics', None)
+        if metrics is not None:
+            item.update(metrics.to_dict())
+        stats.append(item)
+    return stats
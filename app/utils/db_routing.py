@@ -0,0 +1,85 @@
+"""读写分离：只读页面的查询发往只读副本（SQLALCHEMY_BINDS['replica']），其余一律走主库
+
+- 视图用 @read_replica 标记，只对 GET / HEAD 生效；未配置副本时不起作用
+- 即使在只读页面中，flush 和 INSERT / UPDATE / DELETE 语句也始终发往主库
+- 会话提交过写入后，同一浏览器在 READ_REPLICA_STICKY_SECONDS 秒内的请求都读主库，保证能读到自己刚写的数据
+- 读出后要放进进程内缓存的数据用 `with on_primary():` 从主库读，避免副本延迟被缓存下来
+- 本地测试：复制一份 SQLite 数据库文件，把 DATABASE_REPLICA_URL 指向它
+"""
+import time
+from contextlib import contextmanager
+from functools import wraps
+from flask import current_app, g, has_app_context, has_request_context, request, session as http_session
+from flask_sqlalchemy.session import Session as FlaskSession
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+REPLICA_BIND = 'replica'
+STICKY_KEY = '_db_primary_until'
+
+
+def _replica_requested():
+    return has_app_context() and g.get('db_read_replica', False)
+
+
+class RoutingSession(FlaskSession):
+    """默认库的读查询在 @read_replica 请求中改发副本；写入记录到 session.info 供提交后粘滞主库"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None:
+            return engine
+        if self._flushing or getattr(clause, 'is_dml', False):
+            self.info['db_wrote'] = True
+            return engine
+        if _replica_requested() and engine is self._db.engines.get(None):
+            return self._db.engines.get(REPLICA_BIND, engine)
+        return engine
+
+
+def read_replica(f):
+    """只读视图装饰器（放在 login_required 之后，登录用户仍从主库加载）"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if request.method in ('GET', 'HEAD') and REPLICA_BIND in current_app.config.get('SQLALCHEMY_BINDS', {}):
+            primary_until = http_session.get(STICKY_KEY)
+            if primary_until is None:
+                g.db_read_replica = True
+            elif primary_until <= time.time():
+                http_session.pop(STICKY_KEY, None)
+                g.db_read_replica = True
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+@contextmanager
+def on_primary():
+    """在只读页面中临时改回主库"""
+    previous = _replica_requested()
+    if previous:
+        g.db_read_replica = False
+    try:
+        yield
+    finally:
+        if previous:
+            g.db_read_replica = True
+
+
+def _after_commit(session):
+    if not session.info.pop('db_wrote', False) or not has_request_context():
+        return
+    sticky = current_app.config.get('READ_REPLICA_STICKY_SECONDS', 10)
+    if sticky and REPLICA_BIND in current_app.config.get('SQLALCHEMY_BINDS', {}):
+        http_session[STICKY_KEY] = time.time() + sticky
+        g.db_read_replica = False
+
+
+def _after_rollback(session):
+    session.info.pop('db_wrote', None)
+
+
+def register_routing_events():
+    """注册写入后粘滞主库的事件（重复调用无副作用）"""
+    for name, listener in (('after_commit', _after_commit), ('after_rollback', _after_rollback)):
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
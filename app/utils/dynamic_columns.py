@@ -0,0 +1,144 @@
+"""动态列：进程内缓存的列元数据注册表 + 按一批项目一次性加载列值
+
+列元数据很少变化，缓存 DYNAMIC_COLUMN_CACHE_TTL 秒；列管理接口修改后调用 invalidate_columns()
+立即失效本进程缓存（其他进程最迟在 TTL 后刷新）。
+"""
+import threading
+import time
+from collections import namedtuple
+from flask import current_app
+from app import db
+from app.models import DynamicColumn, ProjectDynamicValue
+from app.utils.db_routing import on_primary
+
+# data_type -> 存值字段
+VALUE_FIELDS = {
+    'string': 'value_string',
+    'integer': 'value_integer',
+    'date': 'value_date',
+    'boolean': 'value_boolean',
+}
+
+
+class ColumnInfo(namedtuple('ColumnInfo', 'id name data_type is_active')):
+    __slots__ = ()
+
+    @property
+    def value_field(self):
+        return VALUE_FIELDS.get(self.data_type)
+
+
+_registry = {'columns': None, 'expires': 0.0}
+_lock = threading.Lock()
+
+
+def _load_columns():
+    # 结果要缓存 DYNAMIC_COLUMN_CACHE_TTL 秒，不从可能有延迟的副本读取
+    with on_primary():
+        rows = db.session.query(
+            DynamicColumn.id, DynamicColumn.name, DynamicColumn.data_type, DynamicColumn.is_active
+        ).order_by(DynamicColumn.id).all()
+    return {r.id: ColumnInfo(r.id, r.name, r.data_type, bool(r.is_active)) for r in rows}
+
+
+def all_columns():
+    """{列 id: ColumnInfo}（含停用列），过期后重新查询一次"""
+    now = time.monotonic()
+    columns = _registry['columns']
+    if columns is not None and now < _registry['expires']:
+        return columns
+    with _lock:
+        if _registry['columns'] is None or time.monotonic() >= _registry['expires']:
+            _registry['columns'] = _load_columns()
+            _registry['expires'] = time.monotonic() + current_app.config.get('DYNAMIC_COLUMN_CACHE_TTL', 300)
+        return _registry['columns']
+
+
+def active_columns():
+    """启用中的动态列，按创建顺序"""
+    return [column for column in all_columns().values() if column.is_active]
+
+
+def get_column(column_id):
+    return all_columns().get(column_id)
+
+
+def invalidate_columns():
+    """列增删改后调用"""
+    with _lock:
+        _registry['columns'] = None
+        _registry['expires'] = 0.0
+
+
+def registry_version():
+    """列元数据快照（供条件 GET 校验值使用；不用 hash()，各进程的字符串哈希种子不同）"""
+    return tuple(all_columns().values())
+
+
+def load_dynamic_values(project_ids, columns=None):
+    """一条 IN 查询取出一批项目的动态列值，返回 {项目 id: {列 id: 值}}"""
+    columns = active_columns() if columns is None else columns
+    project_ids = list(project_ids)
+    values = {project_id: {} for project_id in project_ids}
+    by_id = {column.id: column for column in columns if column.value_field}
+    if not project_ids or not by_id:
+        return values
+
+    rows = db.session.query(
+        ProjectDynamicValue.project_id, ProjectDynamicValue.column_id,
+        ProjectDynamicValue.value_string, ProjectDynamicValue.value_integer,
+        ProjectDynamicValue.value_date, ProjectDynamicValue.value_boolean
+    ).filter(
+        ProjectDynamicValue.project_id.in_(project_ids),
+        ProjectDynamicValue.column_id.in_(by_id)
+    ).all()
+    for row in rows:
+        values[row.project_id][row.column_id] = getattr(row, by_id[row.column_id].value_field)
+    return values
+
+
+def upsert_dynamic_values(rows, chunk_size=500):
+    """批量写入动态列值：rows 为 [(项目 id, ColumnInfo, 值)]
+
+    按项目 id 分块查出已有的 (项目, 列) 记录，已有的 bulk update，其余 bulk insert。
+    """
+    fields = VALUE_FIELDS.values()
+    pending = {}
+    for project_id, column, value in rows:
+        mapping = {'project_id': project_id, 'column_id': column.id}
+        mapping.update({field: None for field in fields})
+        mapping[column.value_field] = value
+        pending[(project_id, column.id)] = mapping
+    if not pending:
+        return 0
+
+    project_ids = sorted({project_id for project_id, _ in pending})
+    existing = {}
+    for i in range(0, len(project_ids), chunk_size):
+        existing.update(((r.project_id, r.column_id), r.id) for r in db.session.query(
+            ProjectDynamicValue.id, ProjectDynamicValue.project_id, ProjectDynamicValue.column_id
+        ).filter(ProjectDynamicValue.project_id.in_(project_ids[i:i + chunk_size])))
+
+    # bulk 操作只合并「相邻且字段相同」的行：按列排序，同一列的值在一条 executemany 里写完
+    updates, inserts = [], []
+    for key, mapping in sorted(pending.items(), key=lambda item: (item[0][1], item[0][0])):
+        if key in existing:
+            updates.append(dict(mapping, id=existing[key]))
+        else:
+            inserts.append(mapping)
+    if updates:
+        db.session.bulk_update_mappings(ProjectDynamicValue, updates)
+    if inserts:
+        db.session.bulk_insert_mappings(ProjectDynamicValue, inserts, render_nulls=True)
+    return len(pending)
+
+
+def format_value(value, data_type):
+    """列表/导出显示用"""
+    if value is None:
+        return ''
+    if data_type == 'boolean':
+        return '是' if value else '否'
+    if data_type == 'date':
+        return value.strftime('%Y-%m-%d')
+    return value
@@ -0,0 +1,225 @@
+"""Excel 批量导入：按集合查重 + 分批批量插入（项目、模板步骤、动态列值都走 bulk 操作）"""
+import pandas as pd
+from flask import current_app
+from app import db
+from app.models import Project
+from app.utils.rollup import new_deltas, add_project_delta, apply_deltas
+from app.utils.step_templates import template_index, counter_values, insert_template_steps
+from app.utils.dynamic_columns import active_columns, upsert_dynamic_values
+from app.utils.search import reindex_projects
+
+
+def _chunks(items, size):
+    """把列表按 size 切块"""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def find_existing_contract_numbers(numbers, chunk_size=500):
+    """用若干条 IN (...) 查询找出库中已存在的合同编号（走 contract_number 唯一索引）"""
+    existing = set()
+    numbers = list(set(numbers))
+    for chunk in _chunks(numbers, chunk_size):
+        rows = db.session.query(Project.contract_number).filter(
+            Project.contract_number.in_(chunk)
+        ).all()
+        existing.update(r[0] for r in rows)
+    return existing
+
+
+def find_project_ids(numbers, chunk_size=500):
+    """按合同编号分块回查项目 id：{合同编号: id}"""
+    ids = {}
+    numbers = list(numbers)
+    for chunk in _chunks(numbers, chunk_size):
+        ids.update((number, project_id) for project_id, number in db.session.query(
+            Project.id, Project.contract_number
+        ).filter(Project.contract_number.in_(chunk)))
+    return ids
+
+
+def _to_date(value):
+    """已由 parse_date_columns 解析的单元格直接取日期，其余按原来的方式解析（失败抛异常）"""
+    return (value if isinstance(value, pd.Timestamp) else pd.to_datetime(value)).date()
+
+
+TRUE_VALUES = ('是', 'true', '1', 'y', 'yes')
+FALSE_VALUES = ('否', 'false', '0', 'n', 'no')
+
+
+def coerce_cell(value, data_type):
+    """按动态列类型转换单元格的值；空单元格返回 None，无法转换抛 ValueError"""
+    if pd.isna(value) or (isinstance(value, str) and not value.strip()):
+        return None
+    if data_type == 'integer':
+        number = float(value)
+        if not number.is_integer():
+            raise ValueError(f'{value} 不是整数')
+        return int(number)
+    if data_type == 'date':
+        return _to_date(value)
+    if data_type == 'boolean':
+        if isinstance(value, (bool, int, float)) and value in (0, 1):
+            return bool(value)
+        text = str(value).strip().lower()
+        if text in TRUE_VALUES:
+            return True
+        if text in FALSE_VALUES:
+            return False
+        raise ValueError(f'{value} 不是是/否')
+    return str(value).strip()[:500]
+
+
+def row_dynamic_values(row, columns):
+    """工作簿中与启用动态列同名的列：[(ColumnInfo, 值)]，空单元格跳过"""
+    values = []
+    for column in columns:
+        try:
+            value = coerce_cell(row[column.name], column.data_type)
+        except (ValueError, TypeError) as e:
+            raise ValueError(f'{column.name}: {e}')
+        if value is not None:
+            values.append((column, value))
+    return values
+
+
+def row_to_mapping(row):
+    """把一行 Excel 数据转换为 Project 字段字典（转换失败直接抛异常）"""
+    return {
+        'contract_name': str(row['合同项目']),
+        'sign_date': _to_date(row['签订日期']) if pd.notna(row['签订日期']) else None,
+        'contract_number': str(row['合同编号']),
+        'contract_progress': str(row.get('合同进度', '未开始')),
+        'party_a': str(row['甲方']),
+        'party_b': str(row['乙方']),
+        'party_c': str(row.get('丙方', '')) if pd.notna(row.get('丙方')) else None,
+        'project_amount': float(row.get('项目金额', 0)) if pd.notna(row.get('项目金额')) else 0.0,
+        'invoice_status': str(row.get('发票开具情况', '未开具')),
+        'payment_status': str(row.get('收款情况', '未收款')),
+        'supply_status': str(row.get('供货情况', '未供货')),
+        'acceptance_status': str(row.get('验收情况', '未验收')),
+        'maintenance_time': _to_date(row.get('维保时间')) if pd.notna(row.get('维保时间')) else None,
+        'business_person': str(row.get('商务人员', '')) if pd.notna(row.get('商务人员')) else None,
+        'project_manager': str(row.get('项目负责人', '')) if pd.notna(row.get('项目负责人')) else None,
+    }
+
+
+REQUIRED_COLUMNS = ['合同项目', '签订日期', '合同编号', '甲方', '乙方']
+
+
+def row_template_name(row):
+    """可选列「步骤模板」：为空时使用默认模板"""
+    value = row.get('步骤模板')
+    if pd.isna(value):
+        return None
+    return str(value).strip() or None
+
+
+def _insert_batch(mappings, steps_by_number, values_by_number):
+    """批量插入一批项目及其模板步骤、动态列值，并在同一事务内更新仪表盘汇总表"""
+    chunk_size = current_app.config.get('IMPORT_LOOKUP_CHUNK_SIZE', 500)
+    # render_nulls：可空字段有无值不同的行也能合并成一条 executemany
+    db.session.bulk_insert_mappings(Project, mappings, render_nulls=True)
+    ids = find_project_ids([m['contract_number'] for m in mappings], chunk_size)
+    insert_template_steps({ids[number]: items for number, items in steps_by_number.items() if items})
+    upsert_dynamic_values([
+        (ids[number], column, value)
+        for number, values in values_by_number.items() for column, value in values
+    ], chunk_size)
+    reindex_projects(db.session.connection(), ids.values())
+    deltas = new_deltas()
+    for mapping in mappings:
+        add_project_delta(deltas, mapping)
+    apply_deltas(db.session.connection(), deltas)
+
+
+DATE_COLUMNS = ['签订日期', '维保时间']
+
+
+def parse_date_columns(excel_data, columns):
+    """日期列整列向量化解析（逐行 pd.to_datetime 每行都要猜格式，是导入的主要耗时）
+
+    解析失败的单元格保留原值，逐行转换时照常报错。返回新的 DataFrame，不修改传入的数据。
+    """
+    excel_data = excel_data.copy()
+    for name in columns:
+        if name not in excel_data.columns:
+            continue
+        original = excel_data[name]
+        parsed = pd.to_datetime(original, errors='coerce')
+        excel_data[name] = parsed.astype(object).where(parsed.notna() | original.isna(), original)
+    return excel_data
+
+
+def missing_columns(excel_data):
+    """返回工作簿中缺少的必需列"""
+    return [col for col in REQUIRED_COLUMNS if col not in excel_data.columns]
+
+
+def import_projects(excel_data, on_batch=None):
+    """导入 DataFrame 中的项目，返回 (成功数, 错误列表)
+
+    - 合同编号先整体收集，再分块 IN 查询查重，不再逐行 SELECT
+    - 新项目按 IMPORT_BATCH_SIZE 分批 bulk insert，最后统一提交
+    - 步骤模板只查一次；步骤计数器随项目行写入，步骤按批 bulk insert
+    - 与启用动态列同名的列按 data_type 转换后按批 upsert 到 project_dynamic_values
+    - 错误信息格式保持「第N行: ...」
+    - on_batch(已处理行数, 成功数, 错误列表)：每处理完一批调用一次（后台任务用来汇报进度并提交）
+    """
+    batch_size = current_app.config.get('IMPORT_BATCH_SIZE', 1000)
+    lookup_chunk = current_app.config.get('IMPORT_LOOKUP_CHUNK_SIZE', 500)
+
+    existing = find_existing_contract_numbers(
+        [str(n) for n in excel_data['合同编号']], lookup_chunk
+    )
+
+    templates = template_index()
+    dynamic_columns = [c for c in active_columns() if c.value_field and c.name in excel_data.columns]
+    excel_data = parse_date_columns(
+        excel_data, DATE_COLUMNS + [c.name for c in dynamic_columns if c.data_type == 'date']
+    )
+
+    errors = []
+    pending = []
+    pending_steps = {}
+    pending_values = {}
+    success_count = 0
+    processed = 0
+    # 逐行用 dict 访问，比 iterrows 生成的 Series 快一个数量级
+    for index, row in zip(excel_data.index, excel_data.to_dict('records')):
+        processed += 1
+        try:
+            contract_number = str(row['合同编号'])
+            if contract_number in existing:
+                errors.append(f"第{index+2}行: 合同编号 {row['合同编号']} 已存在")
+            elif row_template_name(row) not in templates:
+                errors.append(f"第{index+2}行: 步骤模板 {row_template_name(row)} 不存在")
+            else:
+                mapping = row_to_mapping(row)
+                values = row_dynamic_values(row, dynamic_columns)
+                items = templates[row_template_name(row)]
+                mapping.update(counter_values(items))
+                pending.append(mapping)
+                pending_steps[contract_number] = items
+                pending_values[contract_number] = values
+                # 同一文件内重复的合同编号按「已存在」处理
+                existing.add(contract_number)
+                success_count += 1
+        except Exception as e:
+            errors.append(f"第{index+2}行: {str(e)}")
+
+        if processed % batch_size == 0:
+            if pending:
+                _insert_batch(pending, pending_steps, pending_values)
+                pending = []
+                pending_steps = {}
+                pending_values = {}
+            if on_batch:
+                on_batch(processed, success_count, errors)
+
+    if pending:
+        _insert_batch(pending, pending_steps, pending_values)
+    if on_batch:
+        on_batch(processed, success_count, errors)
+    db.session.commit()
+    return success_count, errors
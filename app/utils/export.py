@@ -0,0 +1,105 @@
+"""项目导出：分块读取 + 流式输出，内存占用与项目数量无关"""
+import csv
+import io
+import tempfile
+from openpyxl import Workbook
+from sqlalchemy import and_
+from sqlalchemy.orm import aliased
+from app import db
+from app.models import Project, ProjectDynamicValue
+from app.utils.filters import apply_project_filters
+from app.utils.dynamic_columns import format_value
+
+EXPORT_HEADERS = [
+    '合同项目', '签订日期', '合同编号', '合同进度', '甲方', '乙方', '丙方',
+    '项目金额', '发票开具情况', '收款情况', '供货情况', '验收情况',
+    '维保时间', '商务人员', '项目负责人', '步骤进度'
+]
+
+EXPORT_COLUMNS = [
+    Project.contract_name, Project.sign_date, Project.contract_number,
+    Project.contract_progress, Project.party_a, Project.party_b, Project.party_c,
+    Project.project_amount, Project.invoice_status, Project.payment_status,
+    Project.supply_status, Project.acceptance_status, Project.maintenance_time,
+    Project.business_person, Project.project_manager,
+    Project.steps_completed, Project.steps_total, Project.steps_percent
+]
+
+
+def export_headers(dynamic_columns=()):
+    """固定列 + 每个动态列一列"""
+    return EXPORT_HEADERS + [column.name for column in dynamic_columns if column.value_field]
+
+
+def _dynamic_value_columns(dynamic_columns):
+    """每个动态列外连接一次 project_dynamic_values（走 project_id + column_id 唯一索引），
+    在同一条查询里把列值转成行上的字段"""
+    joins, values = [], []
+    for column in dynamic_columns:
+        alias = aliased(ProjectDynamicValue)
+        joins.append((alias, and_(alias.project_id == Project.id, alias.column_id == column.id)))
+        values.append(getattr(alias, column.value_field).label(f'dc{column.id}'))
+    return joins, values
+
+
+def iter_export_rows(chunk_size=1000, filters=None, dynamic_columns=()):
+    """按块读取项目（只取列、不构造 ORM 对象；MySQL 下使用服务端游标）
+
+    dynamic_columns 与 export_headers() 使用同一份列表，保证表头和数据列对齐。
+    """
+    dynamic_columns = [column for column in dynamic_columns if column.value_field]
+    joins, values = _dynamic_value_columns(dynamic_columns)
+    query = db.session.query(*EXPORT_COLUMNS, *values)
+    for alias, condition in joins:
+        query = query.outerjoin(alias, condition)
+    query = apply_project_filters(query, filters or {})
+    query = query.order_by(
+        Project.created_at.desc(), Project.id.desc()
+    ).yield_per(chunk_size)
+    for r in query:
+        yield [
+            r.contract_name,
+            r.sign_date.strftime('%Y-%m-%d') if r.sign_date else '',
+            r.contract_number,
+            r.contract_progress,
+            r.party_a,
+            r.party_b,
+            r.party_c or '',
+            r.project_amount,
+            r.invoice_status,
+            r.payment_status,
+            r.supply_status,
+            r.acceptance_status,
+            r.maintenance_time.strftime('%Y-%m-%d') if r.maintenance_time else '',
+            r.business_person or '',
+            r.project_manager or '',
+            f'{r.steps_percent}% ({r.steps_completed}/{r.steps_total})'
+        ] + [format_value(getattr(r, f'dc{column.id}'), column.data_type) for column in dynamic_columns]
+
+
+def stream_csv(rows, headers=EXPORT_HEADERS, flush_rows=500):
+    """CSV 生成器：每攒够 flush_rows 行输出一次（带 BOM，Excel 打开不乱码）"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(headers)
+    for i, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if i % flush_rows == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate(0)
+    yield buffer.getvalue().encode('utf-8')
+
+
+def build_xlsx(rows, headers=EXPORT_HEADERS, max_memory=8 * 1024 * 1024):
+    """写入只写模式工作簿，结果放在 SpooledTemporaryFile 中（小文件留在内存，大文件落盘，关闭即删除）"""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('项目数据')
+    ws.append(headers)
+    for row in rows:
+        ws.append(row)
+    spooled = tempfile.SpooledTemporaryFile(max_size=max_memory, suffix='.xlsx')
+    wb.save(spooled)
+    spooled.seek(0)
+    return spooled
@@ -0,0 +1,111 @@
+"""项目附件打包下载：边读磁盘边生成 ZIP 流，不在内存或临时文件中缓存整个压缩包
+
+- zipfile 写入不可 seek 的缓冲对象，每条目使用数据描述符，写满一块就交给响应输出
+- pdf / 图片 / Office 2007+ 等本身已压缩的格式直接存储（ZIP_STORED），其余 deflate
+- 项目按批查询文件记录，每批查完即归还数据库连接；磁盘上缺失的文件跳过并在压缩包末尾的「缺失文件.txt」中列出
+"""
+import os
+import re
+import time
+import zipfile
+from app import db
+from app.models import Project, ProjectFile
+from app.utils.file_storage import CHUNK_SIZE, file_disk_path
+
+STORED_EXTENSIONS = {
+    'pdf', 'jpg', 'jpeg', 'png', 'gif', 'docx', 'xlsx', 'pptx', 'zip', 'rar', '7z', 'gz', 'mp4', 'mov',
+}
+FILE_TYPE_LABELS = {'contract': '合同文件', 'acceptance': '验收文件', 'other': '其他文件'}
+PROJECT_BATCH_SIZE = 100
+MISSING_LIST_NAME = '缺失文件.txt'
+
+_UNSAFE_CHARS = re.compile(r'[\\/:*?"<>|\x00-\x1f]')
+
+
+def safe_name(name):
+    """去掉文件名中不能用于路径的字符"""
+    return _UNSAFE_CHARS.sub('_', name or '').strip(' .') or '未命名'
+
+
+class _StreamBuffer:
+    """zipfile 的输出目标：只能追加写入，写入的数据由生成器分块取走"""
+
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        self.size = 0
+        return data
+
+
+def iter_project_entries(project_ids, project_folders=True):
+    """按批产出 (压缩包内路径, 磁盘路径)；路径形如 [合同编号_合同名称/]合同文件/原始文件名，重名自动编号"""
+    used = set()
+    project_ids = list(project_ids)
+    for start in range(0, len(project_ids), PROJECT_BATCH_SIZE):
+        chunk = project_ids[start:start + PROJECT_BATCH_SIZE]
+        # 只取列、不构造 ORM 对象，长时间的流式响应中不在 session 里积累对象
+        rows = db.session.query(
+            ProjectFile.file_type, ProjectFile.original_filename, ProjectFile.sha256, ProjectFile.file_path,
+            Project.contract_number, Project.contract_name
+        ).join(Project, Project.id == ProjectFile.project_id).filter(
+            ProjectFile.project_id.in_(chunk)
+        ).order_by(ProjectFile.project_id, ProjectFile.id).all()
+        # 结束事务、把连接还给连接池，传输文件内容期间不占用连接
+        db.session.commit()
+        for row in rows:
+            parts = [FILE_TYPE_LABELS.get(row.file_type, safe_name(row.file_type))]
+            if project_folders:
+                parts.insert(0, safe_name(f'{row.contract_number}_{row.contract_name}'))
+            base, ext = os.path.splitext(safe_name(row.original_filename))
+            name = '/'.join(parts + [base + ext])
+            counter = 2
+            while name in used:
+                name = '/'.join(parts + [f'{base}({counter}){ext}'])
+                counter += 1
+            used.add(name)
+            yield name, file_disk_path(row)
+
+
+def _zip_info(name, stat):
+    # ZIP 时间戳不能早于 1980 年
+    info = zipfile.ZipInfo(name, date_time=max(time.localtime(stat.st_mtime)[:6], (1980, 1, 1, 0, 0, 0)))
+    ext = os.path.splitext(name)[1].lower().lstrip('.')
+    info.compress_type = zipfile.ZIP_STORED if ext in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+    # 预先给出大小，超过 4GB 的条目由 zipfile 自动使用 ZIP64
+    info.file_size = stat.st_size
+    return info
+
+
+def stream_zip(entries):
+    """把 (压缩包内路径, 磁盘路径) 逐个写入 ZIP 并按块产出字节"""
+    buffer = _StreamBuffer()
+    missing = []
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name, path in entries:
+            try:
+                source = open(path, 'rb')
+            except FileNotFoundError:
+                missing.append(name)
+                continue
+            with source, archive.open(_zip_info(name, os.fstat(source.fileno())), 'w') as target:
+                for data in iter(lambda: source.read(CHUNK_SIZE), b''):
+                    target.write(data)
+                    if buffer.size >= CHUNK_SIZE:
+                        yield buffer.drain()
+            if buffer.size:
+                yield buffer.drain()
+        if missing:
+            archive.writestr(MISSING_LIST_NAME, '\n'.join(missing))
+    yield buffer.drain()
@@ -0,0 +1,247 @@
+"""磁盘文件回收与孤儿对账
+
+- 删除文件 / 项目时只在同一事务内写入 file_deletions，提交后由单线程后台任务分批执行；
+  失败的条目保留并累计 attempts，由 `flask gc-files` 重试
+- `flask sweep-files` 双向对账（适合 cron 定期执行，全程分批、不把整个目录读入内存）：
+  磁盘 → 数据库：内容存储、临时目录、旧版上传目录中没有记录引用的文件
+  数据库 → 磁盘：file_blobs / 旧版 project_files 指向的文件是否存在，ref_count 是否与引用数一致
+  默认只报告，--fix 时把孤儿文件加入删除队列并校正 ref_count
+"""
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from sqlalchemy import delete, func, update
+from app import db
+from app.models import FileBlob, FileDeletion, ProjectFile, UploadSession
+from app.utils.file_storage import blob_path, remove_quietly, storage_root
+
+MAX_ATTEMPTS = 5
+SAMPLE_SIZE = 20
+BLOB_NAME = re.compile(r'^[0-9a-f]{64}$')
+
+_executor = None
+
+
+def queue_file_removal(path, sha256=None):
+    """登记待删除的磁盘文件（随调用方的事务提交）"""
+    db.session.add(FileDeletion(path=path, sha256=sha256))
+
+
+def _remove_entry(entry_id, path, sha256):
+    """删除一个队列条目对应的文件并提交；内容已被重新引用时只删除条目，返回 False
+
+    先删除队列记录再加锁复查内容记录，直到文件删除、事务提交之前，同一 sha256 的上传
+    （acquire_blob 的 UPDATE / INSERT）都会等待：MySQL 上由 FOR UPDATE 的行锁 / 间隙锁保证
+    （默认 REPEATABLE READ），SQLite 上第一条写语句即持有库级写锁。
+    """
+    db.session.execute(delete(FileDeletion).where(FileDeletion.id == entry_id))
+    if sha256 and db.session.query(FileBlob.sha256).filter(FileBlob.sha256 == sha256).with_for_update().first():
+        # 排队后同样的内容又被上传，文件继续使用
+        db.session.commit()
+        return False
+    remove_quietly(path)
+    db.session.commit()
+    return True
+
+
+def process_file_deletions(batch_size=500):
+    """分批执行删除队列，返回 (删除数, 失败数)"""
+    removed = failed = 0
+    last_id = 0
+    while True:
+        batch = db.session.query(FileDeletion.id, FileDeletion.path, FileDeletion.sha256).filter(
+            FileDeletion.id > last_id, FileDeletion.attempts < MAX_ATTEMPTS
+        ).order_by(FileDeletion.id).limit(batch_size).all()
+        if not batch:
+            break
+        last_id = batch[-1].id
+        for item in batch:
+            try:
+                if _remove_entry(item.id, item.path, item.sha256):
+                    removed += 1
+            except OSError as e:
+                db.session.rollback()
+                db.session.execute(update(FileDeletion).where(FileDeletion.id == item.id).values(
+                    attempts=FileDeletion.attempts + 1, last_error=str(e)[:500]
+                ))
+                db.session.commit()
+                failed += 1
+    return removed, failed
+
+
+def _run_deletions(app):
+    with app.app_context():
+        try:
+            process_file_deletions()
+        except Exception:
+            db.session.rollback()
+            app.logger.exception('文件删除队列执行失败')
+
+
+def schedule_file_gc():
+    """提交后调用：在后台线程执行删除队列（同一时间只有一个任务，多次调度会排队合并执行）"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='file-gc')
+    _executor.submit(_run_deletions, current_app._get_current_object())
+
+
+class SweepReport:
+    """对账结果：各类问题的计数和前 SAMPLE_SIZE 条路径"""
+
+    CATEGORIES = {
+        'orphan_blobs': '内容存储中无记录的文件',
+        'orphan_temp': '临时目录中无上传会话的文件',
+        'orphan_legacy': '旧版上传目录中无记录的文件',
+        'missing_blobs': '有记录但磁盘上缺失的内容',
+        'missing_legacy': '有记录但磁盘上缺失的旧版文件',
+        'refcount_fixed': '引用计数不一致的内容',
+    }
+
+    def __init__(self):
+        self.counts = {key: 0 for key in self.CATEGORIES}
+        self.samples = {key: [] for key in self.CATEGORIES}
+
+    def add(self, category, path):
+        self.counts[category] += 1
+        if len(self.samples[category]) < SAMPLE_SIZE:
+            self.samples[category].append(path)
+
+    def lines(self):
+        for key, label in self.CATEGORIES.items():
+            yield f'{label}：{self.counts[key]}'
+            for path in self.samples[key]:
+                yield f'  {path}'
+
+
+def _walk_files(root, skip=()):
+    """逐目录 scandir 产出 (路径, 修改时间)，不一次性列出整棵树"""
+    stack = [root]
+    while stack:
+        folder = stack.pop()
+        try:
+            iterator = os.scandir(folder)
+        except FileNotFoundError:
+            continue
+        with iterator:
+            for entry in iterator:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.path not in skip:
+                        stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    yield entry.path, entry.stat(follow_symlinks=False).st_mtime
+
+
+def _batches(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _sweep_blob_files(report, fix, batch_size, cutoff):
+    root = storage_root()
+    for batch in _batches(_walk_files(root, skip={os.path.join(root, 'tmp')}), batch_size):
+        names = {os.path.basename(path) for path, _ in batch}
+        known = {sha256 for (sha256,) in db.session.query(FileBlob.sha256).filter(
+            FileBlob.sha256.in_([name for name in names if BLOB_NAME.match(name)])
+        )}
+        for path, mtime in batch:
+            name = os.path.basename(path)
+            if name in known or mtime > cutoff:
+                continue
+            report.add('orphan_blobs', path)
+            if fix:
+                queue_file_removal(path, name if BLOB_NAME.match(name) else None)
+        if fix:
+            db.session.commit()
+
+
+def _sweep_temp_files(report, fix, batch_size, cutoff):
+    for batch in _batches(_walk_files(os.path.join(storage_root(), 'tmp')), batch_size):
+        active = {path for (path,) in db.session.query(UploadSession.temp_path).filter(
+            UploadSession.temp_path.in_([path for path, _ in batch])
+        )}
+        for path, mtime in batch:
+            if path in active or mtime > cutoff:
+                continue
+            report.add('orphan_temp', path)
+            if fix:
+                queue_file_removal(path)
+        if fix:
+            db.session.commit()
+
+
+def _sweep_legacy_files(report, fix, batch_size, cutoff):
+    root = os.path.join(current_app.config['UPLOAD_FOLDER'], 'projects')
+    for batch in _batches(_walk_files(root), batch_size):
+        referenced = {path for (path,) in db.session.query(ProjectFile.file_path).filter(
+            ProjectFile.file_path.in_([path for path, _ in batch])
+        )}
+        for path, mtime in batch:
+            if path in referenced or mtime > cutoff:
+                continue
+            report.add('orphan_legacy', path)
+            if fix:
+                queue_file_removal(path)
+        if fix:
+            db.session.commit()
+
+
+def _sweep_blob_rows(report, fix, batch_size):
+    last = ''
+    while True:
+        blobs = FileBlob.query.filter(FileBlob.sha256 > last).order_by(FileBlob.sha256).limit(batch_size).all()
+        if not blobs:
+            break
+        last = blobs[-1].sha256
+        refs = dict(db.session.query(ProjectFile.sha256, func.count(ProjectFile.id)).filter(
+            ProjectFile.sha256.in_([blob.sha256 for blob in blobs])
+        ).group_by(ProjectFile.sha256))
+        for blob in blobs:
+            path = blob_path(blob.sha256)
+            if not os.path.exists(path):
+                report.add('missing_blobs', path)
+            actual = refs.get(blob.sha256, 0)
+            if blob.ref_count != actual:
+                report.add('refcount_fixed', f'{blob.sha256} {blob.ref_count} → {actual}')
+                if fix:
+                    if actual:
+                        blob.ref_count = actual
+                    else:
+                        db.session.delete(blob)
+                        queue_file_removal(path, blob.sha256)
+        if fix:
+            db.session.commit()
+
+
+def _sweep_legacy_rows(report, batch_size):
+    last_id = 0
+    while True:
+        rows = db.session.query(ProjectFile.id, ProjectFile.file_path).filter(
+            ProjectFile.sha256.is_(None), ProjectFile.id > last_id
+        ).order_by(ProjectFile.id).limit(batch_size).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        for row in rows:
+            if not os.path.exists(row.file_path):
+                report.add('missing_legacy', row.file_path)
+
+
+def sweep_files(fix=False, batch_size=1000):
+    """双向对账，返回 SweepReport；fix=True 时孤儿文件加入删除队列并校正 ref_count"""
+    cutoff = time.time() - current_app.config.get('FILE_SWEEP_GRACE', 3600)
+    report = SweepReport()
+    _sweep_blob_files(report, fix, batch_size, cutoff)
+    _sweep_temp_files(report, fix, batch_size, cutoff)
+    _sweep_legacy_files(report, fix, batch_size, cutoff)
+    _sweep_blob_rows(report, fix, batch_size)
+    _sweep_legacy_rows(report, batch_size)
+    return report
@@ -0,0 +1,64 @@
+"""项目文件下载：权限检查在路由内完成，字节传输按 FILE_SENDFILE_MODE 交给前置服务器或 sendfile
+
+- 'x-accel'：只返回响应头 X-Accel-Redirect，由 nginx 的 internal location 发送文件（支持 Range）
+- 'x-sendfile'：返回 X-Sendfile 绝对路径，由 Apache / lighttpd 发送
+- 未配置：werkzeug 按 Range / If-None-Match 返回 206 / 304；完整响应用 wsgi.file_wrapper，
+  gunicorn 等服务器据此走 os.sendfile 零拷贝
+内容按 SHA-256 存储、不会改变，ETag 直接用 sha256
+"""
+import mimetypes
+import os
+from urllib.parse import quote
+from flask import Response, current_app, request
+from werkzeug.utils import send_file
+from app.utils.file_storage import file_disk_path, storage_root
+
+# 内容不可变，浏览器缓存一天（仍需登录态，只允许私有缓存）
+DOWNLOAD_MAX_AGE = 24 * 3600
+
+
+def _content_disposition(filename, as_attachment):
+    return ('attachment' if as_attachment else 'inline') + "; filename*=UTF-8''" + quote(filename)
+
+
+def _accel_response(file, path, mimetype, as_attachment):
+    """nginx：先在这里处理 If-None-Match，其余（Range、Content-Length）交给 nginx"""
+    relative = os.path.relpath(path, storage_root()).replace(os.sep, '/')
+    etag = file.sha256
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(mimetype=mimetype)
+        response.headers['X-Accel-Redirect'] = current_app.config.get('FILE_ACCEL_PREFIX', '/protected-files/') + quote(relative)
+        response.headers['Content-Disposition'] = _content_disposition(file.original_filename, as_attachment)
+    response.set_etag(etag)
+    return response
+
+
+def send_project_file(file, as_attachment=False):
+    """返回项目文件的下载响应；磁盘上不存在时返回 None"""
+    path = file_disk_path(file)
+    if not os.path.isfile(path):
+        return None
+    mimetype = mimetypes.guess_type(file.original_filename)[0] or 'application/octet-stream'
+    mode = current_app.config.get('FILE_SENDFILE_MODE')
+
+    # 旧版文件不在内容存储目录下，nginx 的 internal location 访问不到，由本进程发送
+    if mode == 'x-accel' and file.sha256:
+        response = _accel_response(file, path, mimetype, as_attachment)
+    else:
+        response = send_file(
+            path, request.environ,
+            mimetype=mimetype,
+            as_attachment=as_attachment,
+            download_name=file.original_filename,
+            conditional=True,
+            etag=file.sha256 or True,
+            use_x_sendfile=(mode == 'x-sendfile'),
+            response_class=current_app.response_class,
+        )
+    response.cache_control.no_cache = None
+    response.cache_control.private = True
+    response.cache_control.max_age = DOWNLOAD_MAX_AGE
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    return response
@@ -0,0 +1,185 @@
+"""上传文件内容存储：按 SHA-256 去重，相同内容在磁盘上只保存一份
+
+- 目录结构：FILE_STORAGE_FOLDER/ab/cd/<sha256>，写入中的临时文件在 FILE_STORAGE_FOLDER/tmp/
+- file_blobs.ref_count 与 project_files 在同一事务内增减；计数归零的记录随事务删除，
+  磁盘上的内容同时加入删除队列，提交后由后台任务清理（见 file_gc）
+- 事务回滚时已落盘的内容没有记录引用，按孤儿文件处理
+"""
+import hashlib
+import os
+import uuid
+from collections import Counter
+from datetime import datetime
+from flask import current_app
+from werkzeug.utils import secure_filename
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import FileBlob, ProjectFile
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def storage_root():
+    return current_app.config['FILE_STORAGE_FOLDER']
+
+
+def blob_path(sha256):
+    return os.path.join(storage_root(), sha256[:2], sha256[2:4], sha256)
+
+
+def temp_path():
+    folder = os.path.join(storage_root(), 'tmp')
+    os.makedirs(folder, exist_ok=True)
+    return os.path.join(folder, uuid.uuid4().hex)
+
+
+def remove_quietly(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def write_temp(stream):
+    """把上传流分块写入临时文件，同时计算 SHA-256；返回 (临时文件路径, sha256, 字节数)"""
+    digest = hashlib.sha256()
+    size = 0
+    path = temp_path()
+    try:
+        with open(path, 'wb') as out:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+    except BaseException:
+        remove_quietly(path)
+        raise
+    return path, digest.hexdigest(), size
+
+
+def _increment(sha256, count=1):
+    return db.session.execute(
+        update(FileBlob).where(FileBlob.sha256 == sha256).values(ref_count=FileBlob.ref_count + count)
+    ).rowcount
+
+
+def acquire_blob(sha256, size):
+    """引用计数 +1，内容记录不存在时插入；返回 True 表示是新内容"""
+    if _increment(sha256):
+        return False
+    try:
+        with db.session.begin_nested():
+            db.session.execute(insert(FileBlob).values(
+                sha256=sha256, size=size, ref_count=1, created_at=datetime.utcnow()
+            ))
+    except IntegrityError:
+        # 并发上传了相同内容，对方先插入了记录
+        _increment(sha256)
+        return False
+    return True
+
+
+def commit_temp(path, sha256, size):
+    """为临时文件登记一次引用并移入存储目录（调用方负责 commit）
+
+    内容已存在时也用新文件原子替换：旧文件可能正在被删除队列回收（见 file_gc.process_file_deletions），
+    替换后磁盘上一定有本次登记引用的内容。
+    """
+    target = blob_path(sha256)
+    try:
+        acquire_blob(sha256, size)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(path, target)
+    except BaseException:
+        remove_quietly(path)
+        raise
+    return target
+
+
+def store_stream(stream):
+    """保存上传内容并登记引用，返回 (sha256, 字节数, 存储路径)"""
+    path, sha256, size = write_temp(stream)
+    return sha256, size, commit_temp(path, sha256, size)
+
+
+def add_project_file(project_id, filename, file_type, sha256, size, path, user):
+    """登记引用已存储内容的项目文件（调用方负责 commit）"""
+    file = ProjectFile(
+        project_id=project_id,
+        filename=secure_filename(filename),
+        original_filename=filename,
+        file_type=file_type,
+        file_path=path,
+        sha256=sha256,
+        file_size=size,
+        uploaded_by=user.id
+    )
+    db.session.add(file)
+    return file
+
+
+def release_blobs(hashes):
+    """按出现次数减少引用计数，删除归零的记录；返回被删除的 sha256 列表"""
+    counts = Counter(h for h in hashes if h)
+    if not counts:
+        return []
+    for sha256, count in counts.items():
+        _increment(sha256, -count)
+    dead = db.session.scalars(
+        select(FileBlob.sha256).where(FileBlob.sha256.in_(counts), FileBlob.ref_count <= 0)
+    ).all()
+    if dead:
+        db.session.execute(delete(FileBlob).where(FileBlob.sha256.in_(dead)))
+    return dead
+
+
+def delete_project_files(files):
+    """删除文件记录、释放内容引用，不再被引用的磁盘文件加入删除队列（调用方负责 commit 后调用 schedule_file_gc）"""
+    from app.utils.file_gc import queue_file_removal
+    files = list(files)
+    if not files:
+        return
+    for file in files:
+        db.session.delete(file)
+    db.session.flush()
+    for sha256 in release_blobs(file.sha256 for file in files):
+        queue_file_removal(blob_path(sha256), sha256)
+    for file in files:
+        if not file.sha256:
+            queue_file_removal(file.file_path)
+
+
+def file_disk_path(file):
+    return blob_path(file.sha256) if file.sha256 else file.file_path
+
+
+def migrate_legacy_files(batch_size=100):
+    """把旧版按项目目录保存的文件迁入内容存储；返回 (迁移数, 磁盘上缺失的文件数)"""
+    migrated = missing = 0
+    last_id = 0
+    while True:
+        files = ProjectFile.query.filter(ProjectFile.sha256.is_(None), ProjectFile.id > last_id) \
+            .order_by(ProjectFile.id).limit(batch_size).all()
+        if not files:
+            break
+        last_id = files[-1].id
+        old_paths = []
+        for file in files:
+            if not os.path.isfile(file.file_path):
+                missing += 1
+                continue
+            with open(file.file_path, 'rb') as source:
+                sha256, size, path = store_stream(source)
+            old_paths.append(file.file_path)
+            file.sha256, file.file_size, file.file_path = sha256, size, path
+            migrated += 1
+        db.session.commit()
+        for path in old_paths:
+            # 同名上传曾互相覆盖，多条旧记录可能指向同一个文件
+            if not ProjectFile.query.filter(ProjectFile.file_path == path).first():
+                remove_quietly(path)
+    return migrated, missing
@@ -0,0 +1,148 @@
+"""项目列表筛选：全部使用可走索引的谓词（日期区间、等值、前缀匹配）"""
+import re
+from datetime import date
+from sqlalchemy import and_, func, or_, select
+from app import db
+from app.models import Project, ProjectDynamicValue
+from app.utils.dynamic_columns import active_columns, get_column
+
+# 按前缀匹配的人员/单位列
+PREFIX_COLUMNS = {
+    'project_manager': Project.project_manager,
+    'business_person': Project.business_person,
+    'party_a': Project.party_a,
+}
+
+
+def _month_range(year, month):
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
+
+
+def _escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _int_arg(args, name, low, high):
+    try:
+        value = int(args.get(name) or 0)
+    except (TypeError, ValueError):
+        return None
+    return value if low <= value <= high else None
+
+
+# 动态列筛选参数：dc<列 id>=值（字符串前缀 / 整数、日期、布尔等值），整数和日期另有 dc<列 id>_min / _max 区间
+DYNAMIC_FILTER_KEY = re.compile(r'^dc(\d+)(?:_(min|max))?$')
+RANGE_TYPES = ('integer', 'date')
+
+
+def coerce_dynamic_value(value, data_type):
+    """按动态列类型转换参数值，非法值抛 ValueError"""
+    if data_type == 'integer':
+        return int(value)
+    if data_type == 'date':
+        return date.fromisoformat(value)
+    if data_type == 'boolean':
+        if value in ('1', 'true', '是'):
+            return True
+        if value in ('0', 'false', '否'):
+            return False
+        raise ValueError(value)
+    return value
+
+
+def get_dynamic_filters(args):
+    """取出启用中动态列的有效筛选条件（类型不符的值忽略）"""
+    filters = {}
+    for column in active_columns():
+        suffixes = ('', '_min', '_max') if column.data_type in RANGE_TYPES else ('',)
+        for suffix in suffixes:
+            key = f'dc{column.id}{suffix}'
+            value = (args.get(key) or '').strip()
+            if not value:
+                continue
+            try:
+                filters[key] = coerce_dynamic_value(value, column.data_type)
+            except ValueError:
+                continue
+    return filters
+
+
+def get_filters(args):
+    """从请求参数中取出有效的筛选条件（空值忽略）"""
+    filters = {}
+    year = _int_arg(args, 'year', 1900, 9999)
+    month = _int_arg(args, 'month', 1, 12)
+    if year:
+        filters['year'] = year
+    if month:
+        filters['month'] = month
+    for name in ('contract_progress',) + tuple(PREFIX_COLUMNS):
+        value = (args.get(name) or '').strip()
+        if value:
+            filters[name] = value
+    filters.update(get_dynamic_filters(args))
+    return filters
+
+
+def filter_signature(filters):
+    """筛选条件的稳定键，用于总数缓存"""
+    return tuple(sorted(filters.items()))
+
+
+def apply_project_filters(query, filters):
+    """把筛选条件加到 query 上
+
+    - 年/月 → sign_date 区间（不用 extract，保证能走 ix_projects_sign_date）
+    - 只选月份时按库中签订日期的年份范围展开成若干区间
+    - 人员/甲方 → LIKE 'xxx%' 前缀匹配
+    - 动态列 → project_id IN (按 (column_id, value_*) 复合索引查出的子查询)
+    """
+    year, month = filters.get('year'), filters.get('month')
+    if year and month:
+        start, end = _month_range(year, month)
+        query = query.filter(Project.sign_date >= start, Project.sign_date < end)
+    elif year:
+        query = query.filter(Project.sign_date >= date(year, 1, 1), Project.sign_date < date(year + 1, 1, 1))
+    elif month:
+        # min/max 只读索引两端
+        first, last = db.session.query(func.min(Project.sign_date), func.max(Project.sign_date)).one()
+        if first is None:
+            return query.filter(db.false())
+        ranges = []
+        for y in range(first.year, last.year + 1):
+            start, end = _month_range(y, month)
+            ranges.append(and_(Project.sign_date >= start, Project.sign_date < end))
+        query = query.filter(or_(*ranges))
+
+    if filters.get('contract_progress'):
+        query = query.filter(Project.contract_progress == filters['contract_progress'])
+
+    for name, column in PREFIX_COLUMNS.items():
+        if filters.get(name):
+            query = query.filter(column.like(_escape_like(filters[name]) + '%', escape='\\'))
+
+    for key, value in filters.items():
+        match = DYNAMIC_FILTER_KEY.match(key)
+        if match:
+            query = query.filter(_dynamic_condition(int(match.group(1)), match.group(2), value))
+    return query
+
+
+def _dynamic_condition(column_id, bound, value):
+    column = get_column(column_id)
+    if column is None or not column.value_field:
+        return db.false()
+    field = getattr(ProjectDynamicValue, column.value_field)
+    if bound == 'min':
+        condition = field >= value
+    elif bound == 'max':
+        condition = field <= value
+    elif column.data_type == 'string':
+        condition = field.like(_escape_like(value) + '%', escape='\\')
+    else:
+        condition = field == value
+    return Project.id.in_(
+        select(ProjectDynamicValue.project_id).where(ProjectDynamicValue.column_id == column_id, condition)
+    )
@@ -0,0 +1,182 @@
+"""Excel 导入后台任务：本地进程池执行，进度写回 import_jobs 表
+
+Web 进程重启或子进程崩溃时任务停在 pending / running；超过 IMPORT_JOB_TIMEOUT 的这类任务
+在统计并发数时（或 `flask fail-stale-imports`）标记为失败，不会一直占用并发名额。
+"""
+import json
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+import pandas as pd
+from flask import current_app
+from sqlalchemy import func
+from werkzeug.utils import secure_filename
+from app import db
+from app.models import ImportJob
+from app.utils.excel_import import import_projects, missing_columns
+from app.utils.typeahead import clear_typeahead
+
+_executor = None
+_worker_app = None
+
+
+def _get_executor():
+    """懒加载进程池；max_workers 即同一 Web 进程内的并发上限"""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=current_app.config.get('IMPORT_MAX_WORKERS', 1)
+        )
+    return _executor
+
+
+def fail_stale_jobs():
+    """把开始（未开始的按创建）超过 IMPORT_JOB_TIMEOUT 秒仍未结束的任务标记为失败，返回处理数"""
+    cutoff = datetime.utcnow() - timedelta(seconds=current_app.config.get('IMPORT_JOB_TIMEOUT', 3600))
+    stale = ImportJob.query.filter(
+        ImportJob.status.in_(('pending', 'running')),
+        func.coalesce(ImportJob.started_at, ImportJob.created_at) < cutoff
+    ).all()
+    for job in stale:
+        _mark_failed(job, '任务超时或执行进程已退出，请重新导入')
+    db.session.commit()
+    for job in stale:
+        _remove_workbook(job.file_path)
+    return len(stale)
+
+
+def active_job_count():
+    """排队中 + 执行中的任务数（跨 Web 进程的全局并发上限依据），先清理超时的遗留任务"""
+    fail_stale_jobs()
+    return ImportJob.query.filter(ImportJob.status.in_(('pending', 'running'))).count()
+
+
+class ImportLimitReached(Exception):
+    """进行中的导入任务已达 IMPORT_MAX_ACTIVE_JOBS"""
+
+
+def create_import_job(file, user_id):
+    """暂存上传的工作簿并创建任务记录；进行中的任务已达上限时抛出 ImportLimitReached
+
+    先插入本任务、再在同一事务内加锁统计进行中的任务（含本任务）：SQLite 上插入即持有库级写锁，
+    并发请求依次执行；MySQL 上并发的插入与 FOR UPDATE 互相等待，后到的请求看到先提交的任务，
+    或作为死锁牺牲者回滚，任务数都不会超过上限。
+    """
+    folder = current_app.config['IMPORT_FOLDER']
+    os.makedirs(folder, exist_ok=True)
+    ext = os.path.splitext(secure_filename(file.filename) or file.filename)[1].lower()
+    file_path = os.path.join(folder, f'{uuid.uuid4().hex}{ext}')
+    file.save(file_path)
+
+    job = ImportJob(filename=file.filename, file_path=file_path, created_by=user_id)
+    try:
+        db.session.add(job)
+        db.session.flush()
+        active = db.session.query(ImportJob.id).filter(
+            ImportJob.status.in_(('pending', 'running'))
+        ).with_for_update().all()
+        if len(active) > current_app.config.get('IMPORT_MAX_ACTIVE_JOBS', 2):
+            raise ImportLimitReached()
+        db.session.commit()
+    except BaseException:
+        db.session.rollback()
+        _remove_workbook(file_path)
+        raise
+    return job
+
+
+def submit_import_job(job):
+    """把任务交给进程池；任务结束后丢弃本进程的输入联想索引（导入的项目不经过本进程的 session 事件）"""
+    global _executor
+    args = (run_import_job, current_app.config['CONFIG_NAME'], job.id)
+    try:
+        future = _get_executor().submit(*args)
+    except BrokenProcessPool:
+        # 之前有子进程异常退出，整个进程池已不可用，重建后再提交
+        _executor = None
+        future = _get_executor().submit(*args)
+    app = current_app._get_current_object()
+    future.add_done_callback(lambda done: _on_job_done(app, job.id, done))
+
+
+def _on_job_done(app, job_id, future):
+    global _executor
+    clear_typeahead()
+    error = future.exception()
+    if error is None:
+        return
+    # 子进程崩溃或无法启动：任务自己没有机会写回失败状态
+    if isinstance(error, BrokenProcessPool):
+        _executor = None
+    with app.app_context():
+        job = db.session.get(ImportJob, job_id)
+        if job is not None and not job.is_done:
+            _mark_failed(job, f'导入进程异常退出: {error}')
+            db.session.commit()
+            _remove_workbook(job.file_path)
+
+
+def run_import_job(config_name, job_id):
+    """进程池入口：在子进程内创建应用上下文并执行导入"""
+    global _worker_app
+    if _worker_app is None:
+        from app import create_app
+        _worker_app = create_app(config_name)
+    with _worker_app.app_context():
+        _execute(job_id)
+
+
+def _execute(job_id):
+    job = ImportJob.query.get(job_id)
+    if job is None:
+        return
+    job.status = 'running'
+    job.started_at = datetime.utcnow()
+    db.session.commit()
+
+    try:
+        excel_data = pd.read_excel(job.file_path)
+        missing = missing_columns(excel_data)
+        if missing:
+            _finish(job, 'failed', f'Excel文件缺少必需列: {", ".join(missing)}')
+            return
+
+        job.total_rows = len(excel_data)
+        db.session.commit()
+
+        def on_batch(processed, success_count, errors):
+            # 每批提交一次，状态接口即可看到实时进度
+            job.processed_rows = processed
+            job.success_count = success_count
+            job.error_count = len(errors)
+            job.errors = json.dumps(errors, ensure_ascii=False)
+            db.session.commit()
+
+        import_projects(excel_data, on_batch=on_batch)
+        _finish(job, 'finished')
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception(e)
+        _finish(job, 'failed', f'处理Excel文件时出错: {str(e)}')
+    finally:
+        _remove_workbook(job.file_path)
+
+
+def _finish(job, status, message=None):
+    job.status = status
+    job.message = message
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+
+
+def _mark_failed(job, message):
+    job.status = 'failed'
+    job.message = message[:500]
+    job.finished_at = datetime.utcnow()
+
+
+def _remove_workbook(path):
+    if os.path.exists(path):
+        os.remove(path)
@@ -0,0 +1,205 @@
+"""基于 (created_at, id) 等复合键的游标分页（seek 分页），避免 COUNT(*) + 大 OFFSET"""
+import base64
+import json
+import math
+import threading
+import time
+from datetime import date, datetime
+from flask import current_app, request
+from sqlalchemy import and_, case, or_
+from sqlalchemy.orm import aliased
+from app.models import Project, ProjectDynamicValue
+from app.utils.dynamic_columns import get_column
+
+_count_cache = {}
+_count_lock = threading.Lock()
+
+
+# 列表可选排序：都按降序，最后一列 id 保证唯一（均有对应的复合索引）
+PROJECT_SORTS = {
+    'created': (Project.created_at, Project.id),
+    'progress': (Project.steps_percent, Project.created_at, Project.id),
+}
+# 按动态列排序：sort=dc<列 id>
+DYNAMIC_SORT_PREFIX = 'dc'
+
+
+def dynamic_sort_column(sort):
+    """sort 参数对应的启用中动态列，不是动态列排序返回 None"""
+    if not sort or not sort.startswith(DYNAMIC_SORT_PREFIX) or not sort[len(DYNAMIC_SORT_PREFIX):].isdigit():
+        return None
+    column = get_column(int(sort[len(DYNAMIC_SORT_PREFIX):]))
+    return column if column is not None and column.is_active and column.value_field else None
+
+
+def sort_columns(query, sort):
+    """返回 (query, 排序列)；动态列排序时外连接该列的值（走 project_id + column_id 唯一索引）
+
+    动态列排序键为 (有值标记, 值, created_at, id)：有值的项目排在前面，
+    没有值的项目值为 NULL，由标记列分组后 _seek 中的 == None 会生成 IS NULL。
+    """
+    column = dynamic_sort_column(sort)
+    if column is None:
+        return query, PROJECT_SORTS.get(sort, PROJECT_SORTS['created'])
+    value_alias = aliased(ProjectDynamicValue)
+    value = getattr(value_alias, column.value_field)
+    query = query.outerjoin(value_alias, and_(
+        value_alias.project_id == Project.id, value_alias.column_id == column.id
+    ))
+    has_value = case((value.is_(None), 0), else_=1)
+    return query, (has_value, value, Project.created_at, Project.id)
+
+
+def _dump_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'d': value.isoformat()}
+    return value
+
+
+def _load_value(value):
+    if isinstance(value, dict):
+        return datetime.fromisoformat(value['dt']) if 'dt' in value else date.fromisoformat(value['d'])
+    return value
+
+
+def encode_cursor(values, backwards=False):
+    """把定位键编码为不透明的 URL 安全字符串"""
+    raw = json.dumps([[_dump_value(v) for v in values], int(backwards)])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, size):
+    """解析游标，非法游标（或与当前排序列数不符）返回 None（当作第一页）"""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values, backwards = json.loads(raw)
+        if len(values) != size:
+            return None
+        return [_load_value(v) for v in values], bool(backwards)
+    except (ValueError, TypeError, KeyError, json.JSONDecodeError):
+        return None
+
+
+def _seek(columns, values, after):
+    """按列的字典序构造 (c1, c2, ...) < / > (v1, v2, ...) 条件
+
+    值为 None 时（动态列排序中没有值的一组）只能取等（IS NULL），严格比较恒不成立，跳过；
+    布尔值按 0/1 比较。
+    """
+    values = [int(v) if isinstance(v, bool) else v for v in values]
+    clauses = []
+    for i, column in enumerate(columns):
+        if values[i] is None:
+            continue
+        equal = [c.is_(None) if v is None else c == v for c, v in zip(columns[:i], values[:i])]
+        clauses.append(and_(*equal, column < values[i] if after else column > values[i]))
+    return or_(*clauses)
+
+
+def cached_count(query, key, ttl):
+    """带 TTL 的进程内总数缓存；ttl 为 0 时不缓存"""
+    now = time.monotonic()
+    with _count_lock:
+        hit = _count_cache.get(key)
+        if hit and hit[0] > now:
+            return hit[1]
+    total = query.order_by(None).count()
+    if ttl:
+        with _count_lock:
+            _count_cache[key] = (now + ttl, total)
+    return total
+
+
+def clear_count_cache():
+    """清空总数缓存（项目增删后调用）"""
+    with _count_lock:
+        _count_cache.clear()
+
+
+class KeysetPagination:
+    """游标分页结果，属性尽量与 Flask-SQLAlchemy 的 Pagination 保持一致"""
+
+    def __init__(self, items, per_page, page=1, next_cursor=None, prev_cursor=None, total=None):
+        self.items = items
+        self.per_page = per_page
+        self.page = page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+        # 翻页链接需要保留的其余查询参数（筛选条件等）
+        self.args = {k: v for k, v in request.args.items() if k not in ('cursor', 'page')}
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    @property
+    def next_num(self):
+        return self.page + 1
+
+    @property
+    def prev_num(self):
+        return max(self.page - 1, 1)
+
+    @property
+    def pages(self):
+        if self.total is None:
+            return None
+        return max(math.ceil(self.total / self.per_page), 1)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def keyset_paginate(query, cursor=None, page=1, per_page=20, count_key=None, sort='created'):
+    """按排序键降序做游标分页（PROJECT_SORTS 或动态列 dc<id>）
+
+    query 不要带 order_by；count_key 为 None 时不统计总数，否则按 PAGINATION_COUNT_TTL 缓存总数。
+    """
+    count_query = query
+    query, columns = sort_columns(query, sort)
+    # 排序键随行一起取出，游标直接从结果行生成
+    query = query.add_columns(*[c.label(f'_k{i}') for i, c in enumerate(columns)])
+    position = decode_cursor(cursor, len(columns))
+    if position is None:
+        rows = query.order_by(*[c.desc() for c in columns]).limit(per_page + 1).all()
+        has_more, has_before = len(rows) > per_page, False
+        rows = rows[:per_page]
+    else:
+        values, backwards = position
+        if backwards:
+            rows = query.filter(_seek(columns, values, after=False)).order_by(
+                *[c.asc() for c in columns]).limit(per_page + 1).all()
+            has_before, has_more = len(rows) > per_page, True
+            rows = rows[:per_page][::-1]
+        else:
+            rows = query.filter(_seek(columns, values, after=True)).order_by(
+                *[c.desc() for c in columns]).limit(per_page + 1).all()
+            has_more, has_before = len(rows) > per_page, True
+            rows = rows[:per_page]
+    items = [row[0] for row in rows]
+
+    next_cursor = prev_cursor = None
+    if rows and has_more:
+        next_cursor = encode_cursor(list(rows[-1][1:]))
+    if rows and has_before:
+        prev_cursor = encode_cursor(list(rows[0][1:]), backwards=True)
+    if not has_before:
+        page = 1
+
+    total = None
+    if count_key is not None:
+        total = cached_count(count_query, count_key, current_app.config.get('PAGINATION_COUNT_TTL', 60))
+
+    return KeysetPagination(items, per_page, page, next_cursor, prev_cursor, total)
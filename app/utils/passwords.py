@@ -0,0 +1,128 @@
+"""密码校验：有界线程池执行哈希计算 + 登录失败滑动窗口限流
+
+- pbkdf2 计算（hashlib 计算期间释放 GIL）放到 PASSWORD_HASH_WORKERS 个线程中执行，
+  排队数超过 PASSWORD_VERIFY_MAX_PENDING 时直接拒绝，突发的错误登录不会占满 Web 进程的 CPU
+- 用户名不存在（或没有设置密码）时对一个同等成本的占位哈希做一次校验，响应时间与真实用户一致
+- 登录成功且存储的哈希方法与 PASSWORD_HASH_METHOD 不同时，用新方法重新哈希
+- 限流按用户名、按 IP 分别统计窗口内的失败次数，超过上限后在计算哈希之前拒绝；只在本进程内存中统计
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+DEFAULT_HASH_METHOD = 'pbkdf2:sha256:100000'
+# 限流表最多记录的键数，超过后淘汰最久未失败的键
+MAX_THROTTLE_KEYS = 10000
+
+
+class VerifierBusy(Exception):
+    """校验排队已满"""
+
+
+_executor = None
+_pending = None
+_dummy_hashes = {}
+_init_lock = threading.Lock()
+
+
+def hash_method():
+    return current_app.config.get('PASSWORD_HASH_METHOD', DEFAULT_HASH_METHOD)
+
+
+def make_password_hash(password):
+    return generate_password_hash(password, method=hash_method(), salt_length=16)
+
+
+def needs_rehash(pwhash):
+    return not pwhash or pwhash.split('$', 1)[0] != hash_method()
+
+
+def _dummy_hash(method):
+    """与当前哈希方法成本相同的占位哈希（每个方法只生成一次）"""
+    if method not in _dummy_hashes:
+        _dummy_hashes[method] = generate_password_hash('dummy-password', method=method, salt_length=16)
+    return _dummy_hashes[method]
+
+
+def _get_executor():
+    global _executor, _pending
+    if _executor is None:
+        with _init_lock:
+            if _executor is None:
+                workers = current_app.config.get('PASSWORD_HASH_WORKERS', 2)
+                _pending = threading.BoundedSemaphore(current_app.config.get('PASSWORD_VERIFY_MAX_PENDING', workers * 4))
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password')
+                _dummy_hash(hash_method())
+    return _executor
+
+
+def verify_password(user, password):
+    """在线程池中校验密码；user 为 None 时对占位哈希计算一次后返回 False。排队已满时抛出 VerifierBusy"""
+    executor = _get_executor()
+    pwhash = user.password_hash if user is not None else None
+    target = pwhash or _dummy_hash(hash_method())
+    if not _pending.acquire(blocking=False):
+        raise VerifierBusy()
+    try:
+        matched = executor.submit(check_password_hash, target, password).result()
+    finally:
+        _pending.release()
+    return bool(pwhash) and matched
+
+
+class LoginThrottle:
+    """滑动窗口失败计数：key → 窗口内每次失败的时间戳"""
+
+    def __init__(self):
+        self.failures = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _recent(self, key, now, window):
+        attempts = self.failures.get(key)
+        if attempts is None:
+            return 0
+        while attempts and attempts[0] <= now - window:
+            attempts.popleft()
+        if not attempts:
+            del self.failures[key]
+            return 0
+        return len(attempts)
+
+    def retry_after(self, limits):
+        """limits: [(key, 次数上限)]；任一键超限时返回需要等待的秒数，否则返回 0"""
+        window = current_app.config.get('LOGIN_THROTTLE_WINDOW', 300)
+        now = time.monotonic()
+        wait = 0
+        with self.lock:
+            for key, limit in limits:
+                if self._recent(key, now, window) >= limit:
+                    oldest = self.failures[key][-limit]
+                    wait = max(wait, int(oldest + window - now) + 1)
+        return wait
+
+    def record_failure(self, keys):
+        now = time.monotonic()
+        with self.lock:
+            for key in keys:
+                self.failures.setdefault(key, deque()).append(now)
+                self.failures.move_to_end(key)
+            while len(self.failures) > MAX_THROTTLE_KEYS:
+                self.failures.popitem(last=False)
+
+    def reset(self, key):
+        with self.lock:
+            self.failures.pop(key, None)
+
+
+login_throttle = LoginThrottle()
+
+
+def throttle_limits(username, ip):
+    config = current_app.config
+    return [
+        (f'user:{username.lower()}', config.get('LOGIN_THROTTLE_USER_LIMIT', 5)),
+        (f'ip:{ip}', config.get('LOGIN_THROTTLE_IP_LIMIT', 30)),
+    ]
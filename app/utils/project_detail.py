@@ -0,0 +1,75 @@
+"""项目详情一次性加载：项目 + 步骤、备注 + 作者、文件 三条查询取全"""
+from sqlalchemy.orm import joinedload
+from app import db
+from app.models import Project, ProjectNote, ProjectFile
+
+FILE_TYPES = ('contract', 'acceptance', 'other')
+
+
+def calc_progress(total, completed):
+    percent = completed * 100 // total if total > 0 else 0
+    return {'total': total, 'completed': completed, 'percent': percent}
+
+
+def step_progress(project_id):
+    """从项目上的步骤计数器读取进度（主键查询）"""
+    row = db.session.query(Project.steps_total, Project.steps_completed).filter(Project.id == project_id).first()
+    if row is None:
+        return calc_progress(0, 0)
+    return calc_progress(row.steps_total, row.steps_completed)
+
+
+def step_to_dict(step):
+    return {
+        'id': step.id,
+        'title': step.title,
+        'is_completed': step.is_completed,
+        'is_fixed': step.is_fixed
+    }
+
+
+def load_project_detail(project_id):
+    """加载详情页所需的全部数据；项目不存在返回 None"""
+    project = Project.query.options(joinedload(Project.steps)).filter(Project.id == project_id).first()
+    if project is None:
+        return None
+
+    notes = ProjectNote.query.options(joinedload(ProjectNote.author)).filter(
+        ProjectNote.project_id == project_id
+    ).order_by(ProjectNote.created_at.desc()).all()
+
+    files = {file_type: [] for file_type in FILE_TYPES}
+    for file in ProjectFile.query.filter(ProjectFile.project_id == project_id).order_by(ProjectFile.uploaded_at).all():
+        files.setdefault(file.file_type, []).append(file)
+
+    steps = project.steps
+    progress = calc_progress(len(steps), sum(1 for s in steps if s.is_completed))
+    return {'project': project, 'notes': notes, 'files': files, 'steps': steps, 'progress': progress}
+
+
+def detail_payload(detail):
+    """详情数据转为 JSON 结构（详情页内嵌初始数据 / detail_data 接口共用）"""
+    project = detail['project']
+    return {
+        'project': {
+            'id': project.id,
+            'contract_name': project.contract_name,
+            'contract_number': project.contract_number,
+            'contract_progress': project.contract_progress,
+            'sign_date': project.sign_date.strftime('%Y-%m-%d') if project.sign_date else None,
+            'updated_at': project.updated_at.strftime('%Y-%m-%d %H:%M') if project.updated_at else None,
+        },
+        'notes': [{
+            'id': note.id,
+            'content': note.content,
+            'author': note.author.username if note.author else None,
+            'created_at': note.created_at.strftime('%Y-%m-%d %H:%M') if note.created_at else None,
+        } for note in detail['notes']],
+        'files': {file_type: [{
+            'id': f.id,
+            'filename': f.filename,
+            'original_filename': f.original_filename,
+        } for f in files] for file_type, files in detail['files'].items()},
+        'steps': [step_to_dict(step) for step in detail['steps']],
+        'progress': detail['progress'],
+    }
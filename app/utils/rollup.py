@@ -0,0 +1,157 @@
+"""仪表盘汇总表 project_stats 的增量维护与读取
+
+ORM 的新增/修改/删除在 after_flush 中换算成增量，随同一事务写入；
+bulk insert（Excel 导入）不触发 ORM 事件，需调用 add_project_delta + apply_deltas。
+"""
+from collections import defaultdict
+from sqlalchemy import event, extract, func, inspect
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app import db
+from app.models import Project, ProjectStat
+
+ROLLUP_FIELDS = ('sign_date', 'contract_progress', 'payment_status', 'project_amount')
+
+
+def new_deltas():
+    """增量容器：{(年, 月, 合同进度, 收款情况): [项目数, 金额]}"""
+    return defaultdict(lambda: [0, 0.0])
+
+
+def add_project_delta(deltas, values, sign=1):
+    """把一个项目（字段字典）计入增量，sign=-1 表示移除"""
+    sign_date = values.get('sign_date')
+    if sign_date is None:
+        return
+    key = (sign_date.year, sign_date.month, values.get('contract_progress'), values.get('payment_status'))
+    deltas[key][0] += sign
+    deltas[key][1] += sign * (values.get('project_amount') or 0.0)
+
+
+def _key_filter(key):
+    year, month, progress, payment = key
+    return (
+        (ProjectStat.year == year) & (ProjectStat.month == month)
+        & (ProjectStat.contract_progress == progress) & (ProjectStat.payment_status == payment)
+    )
+
+
+def apply_deltas(connection, deltas):
+    """把增量写入汇总表：先原子 UPDATE 累加，行不存在再 INSERT（并发插入冲突时退回 UPDATE）"""
+    table = ProjectStat.__table__
+    for key, (count, amount) in deltas.items():
+        if not count and not amount:
+            continue
+        update = table.update().where(_key_filter(key)).values(
+            project_count=table.c.project_count + count,
+            total_amount=table.c.total_amount + amount
+        )
+        if connection.execute(update).rowcount:
+            continue
+        year, month, progress, payment = key
+        try:
+            with connection.begin_nested():
+                connection.execute(table.insert().values(
+                    year=year, month=month, contract_progress=progress, payment_status=payment,
+                    project_count=count, total_amount=amount
+                ))
+        except IntegrityError:
+            connection.execute(update)
+
+
+def _old_values(state):
+    values = {}
+    for field in ROLLUP_FIELDS:
+        history = state.attrs[field].history
+        values[field] = (history.deleted or history.unchanged or [None])[0]
+    return values
+
+
+def _current_values(obj):
+    return {field: getattr(obj, field) for field in ROLLUP_FIELDS}
+
+
+def _after_flush(session, flush_context):
+    deltas = new_deltas()
+    for obj in session.new:
+        if isinstance(obj, Project):
+            add_project_delta(deltas, _current_values(obj))
+    for obj in session.deleted:
+        if isinstance(obj, Project):
+            add_project_delta(deltas, _old_values(inspect(obj)), -1)
+    for obj in session.dirty:
+        if not isinstance(obj, Project):
+            continue
+        state = inspect(obj)
+        if any(state.attrs[field].history.has_changes() for field in ROLLUP_FIELDS):
+            add_project_delta(deltas, _old_values(state), -1)
+            add_project_delta(deltas, _current_values(obj))
+    if deltas:
+        apply_deltas(session.connection(), deltas)
+
+
+def register_rollup_events():
+    """注册汇总表维护事件（重复调用无副作用）"""
+    if not event.contains(Session, 'after_flush', _after_flush):
+        event.listen(Session, 'after_flush', _after_flush)
+
+
+def rebuild_project_stats():
+    """全量重建汇总表（首次上线回填或数据修复），返回写入的行数"""
+    year = extract('year', Project.sign_date)
+    month = extract('month', Project.sign_date)
+    rows = db.session.query(
+        year, month, Project.contract_progress, Project.payment_status,
+        func.count(Project.id), func.coalesce(func.sum(Project.project_amount), 0.0)
+    ).filter(Project.sign_date.isnot(None)).group_by(
+        year, month, Project.contract_progress, Project.payment_status
+    ).all()
+
+    ProjectStat.query.delete()
+    db.session.bulk_insert_mappings(ProjectStat, [{
+        'year': int(r[0]), 'month': int(r[1]), 'contract_progress': r[2], 'payment_status': r[3],
+        'project_count': r[4], 'total_amount': float(r[5])
+    } for r in rows])
+    db.session.commit()
+    return len(rows)
+
+
+def stats_totals():
+    """(项目总数, 合同总金额)"""
+    count, amount = db.session.query(
+        func.coalesce(func.sum(ProjectStat.project_count), 0),
+        func.coalesce(func.sum(ProjectStat.total_amount), 0.0)
+    ).one()
+    return int(count), float(amount)
+
+
+def progress_stats():
+    count = func.sum(ProjectStat.project_count)
+    return db.session.query(
+        ProjectStat.contract_progress, count.label('count')
+    ).group_by(ProjectStat.contract_progress).having(count > 0).all()
+
+
+def payment_stats():
+    count = func.sum(ProjectStat.project_count)
+    return db.session.query(
+        ProjectStat.payment_status, count.label('count'),
+        func.sum(ProjectStat.total_amount).label('amount')
+    ).group_by(ProjectStat.payment_status).having(count > 0).all()
+
+
+def year_stats(since_year=None):
+    count = func.sum(ProjectStat.project_count)
+    query = db.session.query(ProjectStat.year.label('year'), count.label('count'))
+    if since_year:
+        query = query.filter(ProjectStat.year >= since_year)
+    return query.group_by(ProjectStat.year).having(count > 0).order_by(ProjectStat.year).all()
+
+
+def month_stats(year):
+    """指定年份 1-12 月的项目数（没有项目的月份补 0，图表按月份位置取值）"""
+    rows = db.session.query(
+        ProjectStat.month, func.sum(ProjectStat.project_count)
+    ).filter(ProjectStat.year == year).group_by(ProjectStat.month).all()
+    counts = {month: int(count) for month, count in rows}
+    return [{'month': m, 'count': counts.get(m, 0)} for m in range(1, 13)]
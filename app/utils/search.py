@@ -0,0 +1,219 @@
+"""全文检索：项目（合同名称、合同编号、甲乙丙方）+ 项目备注
+
+- MySQL：FULLTEXT 索引（ngram 分词器，支持中文），由 InnoDB 自动维护
+- SQLite：FTS5 虚拟表 project_search（trigram 分词器，rowid = 项目 id），
+  由 after_flush 事件同步；bulk insert 的项目需调用 reindex_projects
+"""
+import math
+import re
+from flask import current_app, request
+from sqlalchemy import DDL, bindparam, event, inspect, text
+from sqlalchemy.orm import Session
+from app import db
+from app.models import Project, ProjectNote
+
+SEARCH_FIELDS = ('contract_name', 'contract_number', 'party_a', 'party_b', 'party_c')
+
+FTS_TABLE = 'project_search'
+CREATE_FTS_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+    "USING fts5(title, parties, notes, tokenize='trigram')"
+)
+# trigram 分词最少 3 个字符，更短的词只能退回 LIKE 扫描（仅本地 SQLite 库）
+FTS_MIN_TERM = 3
+
+_FTS_DELETE = text(f'DELETE FROM {FTS_TABLE} WHERE rowid IN :ids').bindparams(bindparam('ids', expanding=True))
+_FTS_INSERT = text(f"""
+    INSERT INTO {FTS_TABLE} (rowid, title, parties, notes)
+    SELECT p.id,
+           p.contract_name || ' ' || p.contract_number,
+           coalesce(p.party_a, '') || ' ' || coalesce(p.party_b, '') || ' ' || coalesce(p.party_c, ''),
+           coalesce((SELECT group_concat(n.content, ' ') FROM project_notes n WHERE n.project_id = p.id), '')
+    FROM projects p WHERE p.id IN :ids
+""").bindparams(bindparam('ids', expanding=True))
+
+_MYSQL_PROJECT_MATCH = 'MATCH (contract_name, contract_number, party_a, party_b, party_c) AGAINST (:q IN BOOLEAN MODE)'
+_MYSQL_NOTE_MATCH = 'MATCH (content) AGAINST (:q IN BOOLEAN MODE)'
+# 项目字段命中的权重高于备注
+_MYSQL_HITS = f"""
+    SELECT id AS project_id, {_MYSQL_PROJECT_MATCH} * 2 AS score FROM projects WHERE {_MYSQL_PROJECT_MATCH}
+    UNION ALL
+    SELECT project_id, {_MYSQL_NOTE_MATCH} AS score FROM project_notes WHERE {_MYSQL_NOTE_MATCH}
+"""
+
+_fts_ready = set()
+
+
+def _dialect(connection):
+    return connection.dialect.name
+
+
+def _has_fts_table(connection):
+    key = str(connection.engine.url)
+    if key not in _fts_ready and inspect(connection).has_table(FTS_TABLE):
+        _fts_ready.add(key)
+    return key in _fts_ready
+
+
+def reindex_projects(connection, project_ids):
+    """重建指定项目的检索记录（MySQL 的 FULLTEXT 自动维护，直接返回）"""
+    project_ids = list(project_ids)
+    if not project_ids or _dialect(connection) != 'sqlite' or not _has_fts_table(connection):
+        return
+    connection.execute(_FTS_DELETE, {'ids': project_ids})
+    connection.execute(_FTS_INSERT, {'ids': project_ids})
+
+
+def rebuild_search_index(batch_size=1000):
+    """全量重建 SQLite 检索表，返回处理的项目数（MySQL 无需重建，返回 0）"""
+    connection = db.session.connection()
+    if _dialect(connection) != 'sqlite':
+        return 0
+    connection.execute(text(CREATE_FTS_SQL))
+    _fts_ready.add(str(connection.engine.url))
+    connection.execute(text(f'DELETE FROM {FTS_TABLE}'))
+    count = 0
+    last_id = 0
+    while True:
+        ids = [r[0] for r in db.session.query(Project.id).filter(Project.id > last_id)
+               .order_by(Project.id).limit(batch_size)]
+        if not ids:
+            break
+        connection.execute(_FTS_INSERT, {'ids': ids})
+        count += len(ids)
+        last_id = ids[-1]
+    db.session.commit()
+    return count
+
+
+def _after_flush(session, flush_context):
+    connection = session.connection()
+    if _dialect(connection) != 'sqlite':
+        return
+    changed, removed = set(), set()
+    for obj in session.new:
+        if isinstance(obj, Project):
+            changed.add(obj.id)
+        elif isinstance(obj, ProjectNote):
+            changed.add(obj.project_id)
+    for obj in session.dirty:
+        if isinstance(obj, Project):
+            state = inspect(obj)
+            if any(state.attrs[field].history.has_changes() for field in SEARCH_FIELDS):
+                changed.add(obj.id)
+        elif isinstance(obj, ProjectNote) and inspect(obj).attrs.content.history.has_changes():
+            changed.add(obj.project_id)
+    for obj in session.deleted:
+        if isinstance(obj, Project):
+            removed.add(obj.id)
+        elif isinstance(obj, ProjectNote):
+            changed.add(obj.project_id)
+    changed -= removed
+    if removed and _has_fts_table(connection):
+        connection.execute(_FTS_DELETE, {'ids': list(removed)})
+    reindex_projects(connection, changed)
+
+
+def register_search_events():
+    """注册检索同步事件；SQLite 下 create_all 时一并建 FTS5 表（重复调用无副作用）"""
+    if not event.contains(Session, 'after_flush', _after_flush):
+        event.listen(Session, 'after_flush', _after_flush)
+    if not getattr(db.metadata, '_search_ddl', False):
+        event.listen(db.metadata, 'after_create', DDL(CREATE_FTS_SQL).execute_if(dialect='sqlite'))
+        db.metadata._search_ddl = True
+
+
+def parse_terms(q):
+    """拆分查询词；去掉全文检索语法字符，避免用户输入被当作运算符"""
+    cleaned = re.sub(r'["+\-<>()~*@\']', ' ', q or '')
+    return [term for term in cleaned.split() if term][:10]
+
+
+class SearchResults:
+    """检索结果分页，属性与列表页的分页对象保持一致"""
+
+    def __init__(self, q, items, page, per_page, total):
+        self.q = q
+        self.items = items  # [(Project, 得分)]
+        self.page = page
+        self.per_page = per_page
+        self.total = total
+        self.args = {k: v for k, v in request.args.items() if k != 'page'}
+
+    @property
+    def pages(self):
+        return max(math.ceil(self.total / self.per_page), 1)
+
+    @property
+    def has_next(self):
+        return self.page < self.pages
+
+    @property
+    def has_prev(self):
+        return self.page > 1
+
+    @property
+    def next_num(self):
+        return self.page + 1
+
+    @property
+    def prev_num(self):
+        return max(self.page - 1, 1)
+
+
+def _mysql_hits(connection, terms, limit, offset, max_results):
+    q = ' '.join(f'+"{term}"' for term in terms)
+    rows = connection.execute(text(f"""
+        SELECT hits.project_id, SUM(hits.score) AS score FROM ({_MYSQL_HITS}) hits
+        GROUP BY hits.project_id ORDER BY score DESC, hits.project_id DESC
+        LIMIT :limit OFFSET :offset
+    """), {'q': q, 'limit': limit, 'offset': offset}).all()
+    total = connection.execute(text(f"""
+        SELECT COUNT(*) FROM (
+            SELECT hits.project_id FROM ({_MYSQL_HITS}) hits GROUP BY hits.project_id LIMIT :cap
+        ) matched
+    """), {'q': q, 'cap': max_results}).scalar()
+    return rows, total
+
+
+def _sqlite_hits(connection, terms, limit, offset, max_results):
+    if not _has_fts_table(connection):
+        return [], 0
+    long_terms = [term for term in terms if len(term) >= FTS_MIN_TERM]
+    short_terms = [term for term in terms if len(term) < FTS_MIN_TERM]
+    where, params = [], {'limit': limit, 'offset': offset, 'cap': max_results}
+    if long_terms:
+        where.append(f'{FTS_TABLE} MATCH :match')
+        params['match'] = ' '.join(f'"{term}"' for term in long_terms)
+    for i, term in enumerate(short_terms):
+        where.append(f"(title LIKE :s{i} OR parties LIKE :s{i} OR notes LIKE :s{i})")
+        params[f's{i}'] = f'%{term}%'
+    score = f'-bm25({FTS_TABLE}, 10.0, 5.0, 1.0)' if long_terms else '0'
+    condition = ' AND '.join(where)
+    rows = connection.execute(text(f"""
+        SELECT rowid AS project_id, {score} AS score FROM {FTS_TABLE}
+        WHERE {condition} ORDER BY score DESC, rowid DESC LIMIT :limit OFFSET :offset
+    """), params).all()
+    total = connection.execute(text(f"""
+        SELECT COUNT(*) FROM (SELECT rowid FROM {FTS_TABLE} WHERE {condition} LIMIT :cap) matched
+    """), params).scalar()
+    return rows, total
+
+
+def search_projects(q, page=1, per_page=None):
+    """按相关度排序的检索结果（页码分页，最多 SEARCH_MAX_RESULTS 条）"""
+    per_page = per_page or current_app.config.get('SEARCH_PER_PAGE', 20)
+    max_results = current_app.config.get('SEARCH_MAX_RESULTS', 1000)
+    terms = parse_terms(q)
+    page = max(min(page, math.ceil(max_results / per_page)), 1)
+    if not terms:
+        return SearchResults(q, [], 1, per_page, 0)
+
+    connection = db.session.connection()
+    hits = _mysql_hits if _dialect(connection) == 'mysql' else _sqlite_hits
+    rows, total = hits(connection, terms, per_page, (page - 1) * per_page, max_results)
+
+    scores = {row.project_id: row.score for row in rows}
+    projects = {p.id: p for p in Project.query.filter(Project.id.in_(scores))} if scores else {}
+    items = [(projects[pid], score) for pid, score in scores.items() if pid in projects]
+    return SearchResults(q, items, page, per_page, total)
@@ -0,0 +1,91 @@
+"""项目步骤计数器 projects.steps_total / steps_completed / steps_percent 的维护与修复
+
+ORM 对 ProjectStep 的增删改在 after_flush 中换算成增量，随同一事务原子累加到 projects 上；
+bulk insert 的步骤需调用 apply_step_deltas。
+"""
+from collections import defaultdict
+from sqlalchemy import case, event, func, inspect
+from sqlalchemy.orm import Session
+from app import db
+from app.models import Project, ProjectStep
+
+
+def percent_expr(total, completed):
+    return case((total > 0, (completed * 100) // total), else_=0)
+
+
+def apply_step_deltas(connection, deltas):
+    """deltas: {project_id: [步骤数增量, 已完成增量]}"""
+    table = Project.__table__
+    for project_id, (total, completed) in deltas.items():
+        if not total and not completed:
+            continue
+        new_total = table.c.steps_total + total
+        new_completed = table.c.steps_completed + completed
+        # steps_percent 放在最前面：MySQL 按顺序求值 SET，后面的列会读到新值
+        connection.execute(
+            table.update().where(table.c.id == project_id).ordered_values(
+                (table.c.steps_percent, percent_expr(new_total, new_completed)),
+                (table.c.steps_total, new_total),
+                (table.c.steps_completed, new_completed),
+            )
+        )
+
+
+def _after_flush(session, flush_context):
+    deltas = defaultdict(lambda: [0, 0])
+    for obj in session.new:
+        if isinstance(obj, ProjectStep):
+            deltas[obj.project_id][0] += 1
+            deltas[obj.project_id][1] += 1 if obj.is_completed else 0
+    for obj in session.deleted:
+        if isinstance(obj, ProjectStep):
+            history = inspect(obj).attrs.is_completed.history
+            was_completed = (history.deleted or history.unchanged or [False])[0]
+            deltas[obj.project_id][0] -= 1
+            deltas[obj.project_id][1] -= 1 if was_completed else 0
+    for obj in session.dirty:
+        if isinstance(obj, ProjectStep):
+            history = inspect(obj).attrs.is_completed.history
+            if history.has_changes():
+                was_completed = bool((history.deleted or [False])[0])
+                deltas[obj.project_id][1] += int(bool(obj.is_completed)) - int(was_completed)
+    if deltas:
+        apply_step_deltas(session.connection(), deltas)
+
+
+def register_step_counter_events():
+    """注册步骤计数器维护事件（重复调用无副作用）"""
+    if not event.contains(Session, 'after_flush', _after_flush):
+        event.listen(Session, 'after_flush', _after_flush)
+
+
+def repair_step_counters(batch_size=1000):
+    """按 id 分批把计数器与 project_steps 实际行数对齐，返回修正的项目数"""
+    fixed = 0
+    last_id = 0
+    while True:
+        projects = db.session.query(
+            Project.id, Project.steps_total, Project.steps_completed, Project.steps_percent
+        ).filter(Project.id > last_id).order_by(Project.id).limit(batch_size).all()
+        if not projects:
+            break
+        last_id = projects[-1].id
+
+        actual = dict((r[0], (r[1], int(r[2] or 0))) for r in db.session.query(
+            ProjectStep.project_id,
+            func.count(ProjectStep.id),
+            func.sum(case((ProjectStep.is_completed == True, 1), else_=0))
+        ).filter(ProjectStep.project_id.in_([p.id for p in projects])).group_by(ProjectStep.project_id))
+
+        updates = []
+        for p in projects:
+            total, completed = actual.get(p.id, (0, 0))
+            percent = completed * 100 // total if total else 0
+            if (p.steps_total, p.steps_completed, p.steps_percent) != (total, completed, percent):
+                updates.append({'id': p.id, 'steps_total': total, 'steps_completed': completed, 'steps_percent': percent})
+        if updates:
+            db.session.bulk_update_mappings(Project, updates)
+            fixed += len(updates)
+        db.session.commit()
+    return fixed
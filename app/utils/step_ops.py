@@ -0,0 +1,154 @@
+"""项目步骤批量操作：一次请求内按顺序执行 add / toggle / rename / reorder / delete，单事务提交
+
+排序值按 ORDER_GAP 稀疏分配：追加取内存中最后一个步骤的 order + ORDER_GAP，
+移动取前后相邻步骤的中点，只有相邻值之间没有空隙时才重排整个列表。
+"""
+from app import db
+from app.models import Project, ProjectStep
+
+ORDER_GAP = 1024
+PROTECTED_TITLES = ('项目验收完成',)
+MAX_TITLE_LENGTH = 200
+
+
+class StepOperationError(ValueError):
+    """批量操作校验失败（整个批次回滚），status 为返回的 HTTP 状态码"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def lock_project_steps(project_id):
+    """锁定项目行（SELECT ... FOR UPDATE）后取出有序步骤列表，串行化同一项目的并发批次"""
+    project = db.session.query(Project).filter(Project.id == project_id).with_for_update().first()
+    if project is None:
+        raise StepOperationError('项目不存在', 404)
+    steps = ProjectStep.query.filter_by(project_id=project_id).order_by(ProjectStep.order, ProjectStep.id).all()
+    return project, steps
+
+
+def _clean_title(value):
+    title = (value or '').strip() if isinstance(value, str) else ''
+    if not title:
+        raise StepOperationError('步骤标题不能为空')
+    if len(title) > MAX_TITLE_LENGTH:
+        raise StepOperationError(f'步骤标题不能超过 {MAX_TITLE_LENGTH} 个字符')
+    return title
+
+
+def _respace(steps):
+    for i, step in enumerate(steps):
+        step.order = (i + 1) * ORDER_GAP
+
+
+def _place(steps, index):
+    """给 steps[index] 分配介于前后相邻步骤之间的排序值"""
+    prev_order = steps[index - 1].order if index > 0 else 0
+    if index + 1 < len(steps):
+        next_order = steps[index + 1].order
+        if next_order - prev_order < 2:
+            _respace(steps)
+            return
+        steps[index].order = (prev_order + next_order) // 2
+    else:
+        steps[index].order = prev_order + ORDER_GAP
+
+
+class StepBatch:
+    """在已锁定的有序步骤列表上执行操作；新增步骤可用 ref 在同一批次的后续操作中引用"""
+
+    def __init__(self, project, steps, user):
+        self.project = project
+        self.steps = steps
+        self.user = user
+        self.refs = {}
+
+    def _find(self, op):
+        key = op.get('id')
+        if isinstance(key, str) and key in self.refs:
+            return self.refs[key]
+        for step in self.steps:
+            if step.id is not None and step.id == key:
+                return step
+        raise StepOperationError(f'步骤不存在：{key}')
+
+    def add(self, op):
+        step = ProjectStep(
+            project_id=self.project.id,
+            title=_clean_title(op.get('title')),
+            is_completed=bool(op.get('is_completed', False)),
+            is_fixed=False
+        )
+        self.steps.append(step)
+        _place(self.steps, len(self.steps) - 1)
+        db.session.add(step)
+        if op.get('ref'):
+            self.refs[str(op['ref'])] = step
+
+    def toggle(self, op):
+        step = self._find(op)
+        if 'is_completed' in op:
+            step.is_completed = bool(op['is_completed'])
+        else:
+            step.is_completed = not step.is_completed
+
+    def rename(self, op):
+        self._find(op).title = _clean_title(op.get('title'))
+
+    def delete(self, op):
+        step = self._find(op)
+        if step.title in PROTECTED_TITLES:
+            raise StepOperationError('系统固定步骤，不可删除', 403)
+        if self.project.created_by != self.user.id and not self.user.is_admin:
+            raise StepOperationError('无权删除', 403)
+        self.steps.remove(step)
+        # 本批次新增后又删除的步骤不再出现在返回的 refs 中，后续操作引用它时报「步骤不存在」
+        self.refs = {ref: target for ref, target in self.refs.items() if target is not step}
+        if step in db.session.new:
+            db.session.expunge(step)
+        else:
+            db.session.delete(step)
+
+    def reorder(self, op):
+        """ids 为完整的新顺序时按 ORDER_GAP 重新分配（值未变的行不会产生 UPDATE）；
+        只移动一个步骤时传 id + after（前一个步骤 id，null 表示移到最前）"""
+        if 'ids' in op:
+            if not isinstance(op['ids'], list):
+                raise StepOperationError('排序列表格式无效')
+            ordered = [self._find({'id': key}) for key in op['ids']]
+            if len(ordered) != len(self.steps) or set(map(id, ordered)) != set(map(id, self.steps)):
+                raise StepOperationError('排序列表必须包含全部步骤且不能重复')
+            self.steps[:] = ordered
+            _respace(self.steps)
+            return
+
+        step = self._find(op)
+        after = self._find({'id': op['after']}) if op.get('after') is not None else None
+        if after is step:
+            raise StepOperationError('步骤不能排在自己之后')
+        self.steps.remove(step)
+        index = self.steps.index(after) + 1 if after is not None else 0
+        self.steps.insert(index, step)
+        _place(self.steps, index)
+
+    OPERATIONS = ('add', 'toggle', 'rename', 'reorder', 'delete')
+
+    def apply(self, ops):
+        if not isinstance(ops, list) or not ops:
+            raise StepOperationError('操作列表不能为空')
+        for op in ops:
+            name = op.get('op') if isinstance(op, dict) else None
+            if name not in self.OPERATIONS:
+                raise StepOperationError(f'不支持的操作：{name}')
+            getattr(self, name)(op)
+        return self.steps
+
+
+def apply_step_operations(project_id, ops, user):
+    """执行一批步骤操作（调用方负责 commit / rollback），返回 (有序步骤列表, {ref: 步骤})"""
+    project, steps = lock_project_steps(project_id)
+    batch = StepBatch(project, steps, user)
+    batch.apply(ops)
+    db.session.flush()
+    return batch.steps, batch.refs
@@ -0,0 +1,100 @@
+"""步骤模板：解析管理员维护的模板，并在项目插入的同一事务内批量写入步骤
+
+步骤计数器直接写在项目行上（Project 字段或导入映射），步骤本身走 bulk insert，
+不经过 ORM 事件，所以不会再逐行累加计数器。
+"""
+from app import db
+from app.models import ProjectStep, StepTemplate
+from app.utils.step_ops import ORDER_GAP
+
+# 没有配置默认模板时沿用原来的三个固定步骤
+FALLBACK_STEPS = [
+    {'title': '项目启动', 'is_completed': True},
+    {'title': '项目验收', 'is_completed': False},
+    {'title': '验收回款', 'is_completed': False},
+]
+
+
+def parse_steps_text(text):
+    """模板编辑框：每行一个步骤，以 * 开头表示创建时即为已完成"""
+    items = []
+    for line in (text or '').splitlines():
+        title = line.strip()
+        completed = title.startswith('*')
+        title = title.lstrip('*').strip()
+        if title:
+            items.append({'title': title[:200], 'is_completed': completed})
+    return items
+
+
+def steps_to_text(items):
+    return '\n'.join(('*' if item.get('is_completed') else '') + item['title'] for item in items)
+
+
+def active_templates():
+    return StepTemplate.query.filter_by(is_active=True).order_by(StepTemplate.is_default.desc(), StepTemplate.name).all()
+
+
+def template_steps(template_id=None):
+    """选定模板（或默认模板）的步骤列表；都没有时返回 FALLBACK_STEPS"""
+    template = None
+    if template_id:
+        template = StepTemplate.query.filter_by(id=template_id, is_active=True).first()
+    if template is None:
+        template = StepTemplate.query.filter_by(is_default=True, is_active=True).first()
+    return template.step_list if template is not None else FALLBACK_STEPS
+
+
+def template_index():
+    """导入用：{模板名称: 步骤列表, None: 默认步骤}，整批导入只查一次"""
+    index = {None: FALLBACK_STEPS}
+    for template in active_templates():
+        index[template.name] = template.step_list
+        if template.is_default:
+            index[None] = template.step_list
+    return index
+
+
+def counter_values(items):
+    """模板对应的项目步骤计数器字段"""
+    total = len(items)
+    completed = sum(1 for item in items if item.get('is_completed'))
+    return {
+        'steps_total': total,
+        'steps_completed': completed,
+        'steps_percent': completed * 100 // total if total else 0,
+    }
+
+
+def step_mappings(project_id, items):
+    return [{
+        'project_id': project_id,
+        'title': item['title'],
+        'is_completed': bool(item.get('is_completed')),
+        'is_fixed': True,
+        'order': (i + 1) * ORDER_GAP,
+    } for i, item in enumerate(items)]
+
+
+def add_project_with_steps(project, items):
+    """在当前事务中插入项目并按模板批量插入步骤（调用方负责 commit）"""
+    for field, value in counter_values(items).items():
+        setattr(project, field, value)
+    db.session.add(project)
+    db.session.flush()
+    if items:
+        db.session.bulk_insert_mappings(ProjectStep, step_mappings(project.id, items))
+    return project
+
+
+def insert_template_steps(steps_by_project):
+    """导入用：一次 bulk insert 一批项目的全部模板步骤
+
+    steps_by_project: {项目 id: 步骤列表}
+    """
+    mappings = []
+    for project_id, items in steps_by_project.items():
+        mappings.extend(step_mappings(project_id, items))
+    if mappings:
+        db.session.bulk_insert_mappings(ProjectStep, mappings)
+    return len(mappings)
@@ -0,0 +1,145 @@
+"""输入联想：甲方 / 商务人员 / 项目负责人的去重取值，进程内有序数组 + 二分查找做前缀匹配
+
+- 首次查询某字段时用一条 GROUP BY 建索引，之后不再查库
+- 本进程内的项目增删改在事务提交后增量更新（回滚则丢弃）
+- 其他进程（后台导入、其他 worker）的改动在 TYPEAHEAD_REBUILD_TTL 秒后整体重建时生效
+"""
+import threading
+import time
+from bisect import bisect_left, insort
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session
+from flask import current_app
+from app import db
+from app.models import Project
+
+TYPEAHEAD_FIELDS = ('party_a', 'business_person', 'project_manager')
+# 先取前缀匹配的前若干个，再按使用次数排序（常用写法排在前面，减少错别字）
+CANDIDATE_LIMIT = 200
+
+
+class PrefixIndex:
+    """去重取值的有序数组（按 casefold 排序）+ 使用次数"""
+
+    def __init__(self, counts):
+        self.counts = dict(counts)
+        self.entries = sorted((value.casefold(), value) for value in self.counts)
+        self.lock = threading.Lock()
+        self.built_at = time.monotonic()
+
+    def lookup(self, prefix, limit=10):
+        key = prefix.casefold()
+        with self.lock:
+            start = bisect_left(self.entries, (key, ''))
+            candidates = []
+            for folded, value in self.entries[start:start + CANDIDATE_LIMIT]:
+                if not folded.startswith(key):
+                    break
+                candidates.append((value, self.counts.get(value, 0)))
+        candidates.sort(key=lambda item: (-item[1], item[0]))
+        return [value for value, _ in candidates[:limit]]
+
+    def apply(self, deltas):
+        """deltas: {取值: 使用次数增量}；次数归零的取值从数组中移除"""
+        with self.lock:
+            for value, delta in deltas.items():
+                before = self.counts.get(value, 0)
+                after = before + delta
+                entry = (value.casefold(), value)
+                if after > 0:
+                    self.counts[value] = after
+                    if before <= 0:
+                        insort(self.entries, entry)
+                else:
+                    self.counts.pop(value, None)
+                    if before > 0:
+                        index = bisect_left(self.entries, entry)
+                        if index < len(self.entries) and self.entries[index] == entry:
+                            del self.entries[index]
+
+
+_indexes = {}
+_build_lock = threading.Lock()
+
+
+def _build(field):
+    column = getattr(Project, field)
+    rows = db.session.query(column, func.count()).filter(column.isnot(None), column != '').group_by(column).all()
+    return PrefixIndex(rows)
+
+
+def get_index(field):
+    """取字段的前缀索引，不存在或超过 TYPEAHEAD_REBUILD_TTL 时重建"""
+    ttl = current_app.config.get('TYPEAHEAD_REBUILD_TTL', 600)
+    index = _indexes.get(field)
+    if index is None or time.monotonic() - index.built_at > ttl:
+        with _build_lock:
+            index = _indexes.get(field)
+            if index is None or time.monotonic() - index.built_at > ttl:
+                index = _indexes[field] = _build(field)
+    return index
+
+
+def suggest(field, prefix, limit=10):
+    prefix = (prefix or '').strip()
+    if field not in TYPEAHEAD_FIELDS or not prefix:
+        return []
+    return get_index(field).lookup(prefix, limit)
+
+
+def clear_typeahead():
+    """丢弃全部索引（下次查询时重建），批量导入等绕过 ORM 的写入后调用"""
+    with _build_lock:
+        _indexes.clear()
+
+
+def _add(deltas, field, value, sign):
+    if value:
+        field_deltas = deltas.setdefault(field, {})
+        field_deltas[value] = field_deltas.get(value, 0) + sign
+
+
+def _after_flush(session, flush_context):
+    deltas = session.info.setdefault('typeahead_deltas', {})
+    for obj in session.new:
+        if isinstance(obj, Project):
+            for field in TYPEAHEAD_FIELDS:
+                _add(deltas, field, getattr(obj, field), 1)
+    for obj in session.deleted:
+        if isinstance(obj, Project):
+            state = inspect(obj)
+            for field in TYPEAHEAD_FIELDS:
+                history = state.attrs[field].history
+                _add(deltas, field, (history.deleted or history.unchanged or [None])[0], -1)
+    for obj in session.dirty:
+        if not isinstance(obj, Project):
+            continue
+        state = inspect(obj)
+        for field in TYPEAHEAD_FIELDS:
+            history = state.attrs[field].history
+            if history.has_changes():
+                _add(deltas, field, (history.deleted or [None])[0], -1)
+                _add(deltas, field, getattr(obj, field), 1)
+
+
+def _after_commit(session):
+    deltas = session.info.pop('typeahead_deltas', None)
+    if not deltas:
+        return
+    for field, field_deltas in deltas.items():
+        # 还没建过的索引不用维护，首次查询时会从数据库完整加载
+        index = _indexes.get(field)
+        if index is not None:
+            index.apply(field_deltas)
+
+
+def _after_rollback(session):
+    session.info.pop('typeahead_deltas', None)
+
+
+def register_typeahead_events():
+    """注册输入联想索引的增量维护事件（重复调用无副作用）"""
+    for name, listener in (('after_flush', _after_flush), ('after_commit', _after_commit),
+                           ('after_rollback', _after_rollback)):
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
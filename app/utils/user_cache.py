@@ -0,0 +1,92 @@
+"""登录用户缓存：user_loader 返回只含 id / username / is_admin 的轻量对象，按用户 id 做 TTL + LRU 缓存
+
+- 本进程内删除用户、修改用户名或管理员标志在事务提交后立即失效对应条目
+- 其他 Web 进程的缓存最多在 USER_CACHE_TTL 秒后过期
+"""
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+from flask_login import UserMixin
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app import db
+from app.models import User
+
+CACHED_FIELDS = ('username', 'is_admin')
+
+
+class UserPrincipal(UserMixin):
+    """current_user 使用的用户信息（不绑定数据库会话）"""
+
+    def __init__(self, id, username, is_admin):
+        self.id = id
+        self.username = username
+        self.is_admin = bool(is_admin)
+
+    def __repr__(self):
+        return f'<UserPrincipal {self.username}>'
+
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def load_principal(user_id):
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return None
+    ttl = current_app.config.get('USER_CACHE_TTL', 60)
+    now = time.monotonic()
+    with _lock:
+        entry = _cache.get(user_id)
+        if entry is not None and now - entry[0] < ttl:
+            _cache.move_to_end(user_id)
+            return entry[1]
+
+    row = db.session.query(User.id, User.username, User.is_admin).filter(User.id == user_id).first()
+    if row is None:
+        invalidate_user(user_id)
+        return None
+    principal = UserPrincipal(row.id, row.username, row.is_admin)
+    with _lock:
+        _cache[user_id] = (now, principal)
+        _cache.move_to_end(user_id)
+        while len(_cache) > current_app.config.get('USER_CACHE_SIZE', 1024):
+            _cache.popitem(last=False)
+    return principal
+
+
+def invalidate_user(user_id):
+    with _lock:
+        _cache.pop(user_id, None)
+
+
+def _after_flush(session, flush_context):
+    changed = session.info.setdefault('user_cache_invalidate', set())
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            changed.add(obj.id)
+    for obj in session.dirty:
+        if isinstance(obj, User):
+            state = inspect(obj)
+            if any(state.attrs[field].history.has_changes() for field in CACHED_FIELDS):
+                changed.add(obj.id)
+
+
+def _after_commit(session):
+    for user_id in session.info.pop('user_cache_invalidate', ()):
+        invalidate_user(user_id)
+
+
+def _after_rollback(session):
+    session.info.pop('user_cache_invalidate', None)
+
+
+def register_user_cache_events():
+    """注册用户缓存失效事件（重复调用无副作用）"""
+    for name, listener in (('after_flush', _after_flush), ('after_commit', _after_commit),
+                           ('after_rollback', _after_rollback)):
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
@@ -0,0 +1,47 @@
+"""add fulltext search
+
+Revision ID: f8b2c6d0e417
+Revises: d41c7a9e5f02
+Create Date: 2026-10-18 16:48:12.530971
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f8b2c6d0e417'
+down_revision = 'd41c7a9e5f02'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'mysql':
+        # ngram 分词器支持中文（ngram_token_size 默认 2）
+        op.create_index('ft_projects_search', 'projects',
+                        ['contract_name', 'contract_number', 'party_a', 'party_b', 'party_c'],
+                        unique=False, mysql_prefix='FULLTEXT', mysql_with_parser='ngram')
+        op.create_index('ft_project_notes_content', 'project_notes', ['content'],
+                        unique=False, mysql_prefix='FULLTEXT', mysql_with_parser='ngram')
+    elif bind.dialect.name == 'sqlite':
+        op.execute("CREATE VIRTUAL TABLE IF NOT EXISTS project_search "
+                   "USING fts5(title, parties, notes, tokenize='trigram')")
+        op.execute("""
+            INSERT INTO project_search (rowid, title, parties, notes)
+            SELECT p.id,
+                   p.contract_name || ' ' || p.contract_number,
+                   coalesce(p.party_a, '') || ' ' || coalesce(p.party_b, '') || ' ' || coalesce(p.party_c, ''),
+                   coalesce((SELECT group_concat(n.content, ' ') FROM project_notes n WHERE n.project_id = p.id), '')
+            FROM projects p
+        """)
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'mysql':
+        op.drop_index('ft_project_notes_content', table_name='project_notes')
+        op.drop_index('ft_projects_search', table_name='projects')
+    elif bind.dialect.name == 'sqlite':
+        op.execute('DROP TABLE IF EXISTS project_search')
@@ -0,0 +1,74 @@
+"""步骤批量操作：同一批次内引用新增步骤 / 请求体校验"""
+from datetime import date
+import pytest
+import config as app_config
+from app import create_app, db
+from app.models import Project, ProjectStep, User
+from app.utils.step_ops import StepOperationError, apply_step_operations
+
+
+class TestingConfig(app_config.DevelopmentConfig):
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+
+@pytest.fixture
+def app():
+    app_config.config['testing'] = TestingConfig
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def user(app):
+    user = User(username='admin', email='admin@example.com', is_admin=True)
+    user.set_password('secret1')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def project(user):
+    project = Project(sign_date=date(2024, 1, 1), party_a='甲方', party_b='乙方',
+                      contract_number='HT-001', contract_name='测试合同', created_by=user.id)
+    db.session.add(project)
+    db.session.commit()
+    return project
+
+
+def test_add_then_delete_same_ref(project, user):
+    steps, refs = apply_step_operations(project.id, [
+        {'op': 'add', 'title': '临时步骤', 'ref': 'tmp'},
+        {'op': 'add', 'title': '保留步骤', 'ref': 'keep'},
+        {'op': 'delete', 'id': 'tmp'},
+    ], user)
+    db.session.commit()
+
+    assert set(refs) == {'keep'}
+    assert refs['keep'].id is not None
+    assert [step.title for step in steps] == ['保留步骤']
+    assert ProjectStep.query.filter_by(project_id=project.id).count() == 1
+
+
+def test_ref_of_deleted_step_is_rejected(project, user):
+    with pytest.raises(StepOperationError):
+        apply_step_operations(project.id, [
+            {'op': 'add', 'title': '临时步骤', 'ref': 'tmp'},
+            {'op': 'delete', 'id': 'tmp'},
+            {'op': 'rename', 'id': 'tmp', 'title': '改名'},
+        ], user)
+    db.session.rollback()
+
+
+@pytest.mark.parametrize('body', ['[1]', '"x"', '{"ops": "add"}'])
+def test_batch_route_rejects_malformed_body(app, project, body):
+    client = app.test_client()
+    client.post('/auth/login', data={'username': 'admin', 'password': 'secret1'})
+    response = client.post(f'/projects/{project.id}/steps/batch', data=body, content_type='application/json')
+    assert response.status_code == 400